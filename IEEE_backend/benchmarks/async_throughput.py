@@ -0,0 +1,93 @@
+# Compares concurrent throughput of the blocking client on a threadpool
+# (how sync def routes run) against the async client on one event loop.
+#
+#   python -m benchmarks.async_throughput --requests 2000 --concurrency 200
+import argparse
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from bson import ObjectId
+from pymongo import MongoClient, AsyncMongoClient
+from utils.reader import uri
+
+BENCH_DB = "bench_async"
+
+# Starlette's default threadpool size for sync handlers
+THREADPOOL_SIZE = 40
+
+
+def seed(db, users: int):
+    user_ids = db["user"].insert_many([
+        {"email": f"user{i}@bench.test"} for i in range(users)
+    ]).inserted_ids
+    event_id = db["event"].insert_one({"event_name": "bench"}).inserted_id
+    return user_ids, event_id
+
+
+def sync_request(db, user_id: ObjectId, event_id: ObjectId):
+    db["user"].find_one({"_id": user_id})
+    db["event"].find_one({"_id": event_id})
+
+
+async def async_request(db, user_id: ObjectId, event_id: ObjectId):
+    await asyncio.gather(
+        db["user"].find_one({"_id": user_id}),
+        db["event"].find_one({"_id": event_id})
+    )
+
+
+def run_sync(db, user_ids: list, event_id: ObjectId, requests: int) -> float:
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=THREADPOOL_SIZE) as pool:
+        futures = [
+            pool.submit(sync_request, db, user_ids[i % len(user_ids)], event_id)
+            for i in range(requests)
+        ]
+        for future in futures:
+            future.result()
+    return time.perf_counter() - start
+
+
+async def run_async(db, user_ids: list, event_id: ObjectId, requests: int, concurrency: int) -> float:
+    limit = asyncio.Semaphore(concurrency)
+
+    async def one(i: int):
+        async with limit:
+            await async_request(db, user_ids[i % len(user_ids)], event_id)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=200)
+    args = parser.parse_args()
+
+    client = MongoClient(uri)
+    client.drop_database(BENCH_DB)
+
+    try:
+        user_ids, event_id = seed(client[BENCH_DB], args.users)
+
+        elapsed = run_sync(client[BENCH_DB], user_ids, event_id, args.requests)
+        print(f"sync  ({THREADPOOL_SIZE} threads)  {args.requests / elapsed:10.1f} req/s")
+
+        async def async_main():
+            async_client = AsyncMongoClient(uri)
+            try:
+                return await run_async(async_client[BENCH_DB], user_ids, event_id, args.requests, args.concurrency)
+            finally:
+                await async_client.close()
+
+        elapsed = asyncio.run(async_main())
+        print(f"async ({args.concurrency} in flight)  {args.requests / elapsed:10.1f} req/s")
+    finally:
+        client.drop_database(BENCH_DB)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+# Seeds a throwaway database and times the hot lookups before and after
+# the session indexes exist.
+#
+#   python -m benchmarks.index_lookups --users 50000 --events 40 --teams 5000
+import argparse
+import random
+import string
+import time
+from bson import ObjectId
+from pymongo import MongoClient
+from utils.reader import uri
+from utils.indexes import ensure_session_indexes
+
+BENCH_DB = "bench_indexes"
+
+
+def seed(db, users: int, events: int, teams: int):
+    event_ids = [ObjectId() for _ in range(events)]
+
+    user_ids = db["user"].insert_many([
+        {"email": f"user{i}@bench.test"} for i in range(users)
+    ]).inserted_ids
+    db["registration"].insert_many([
+        {"event_id": random.choice(event_ids), "user_id": user_id}
+        for user_id in user_ids
+    ])
+    db["team"].insert_many([
+        {
+            "event_id": random.choice(event_ids),
+            "team_name": f"team{i}",
+            "team_code": ''.join(random.choices(string.ascii_uppercase + string.digits, k=5))
+        }
+        for i in range(teams)
+    ])
+
+    return event_ids
+
+
+def timed(label: str, runs: int, query):
+    start = time.perf_counter()
+    for _ in range(runs):
+        query()
+    elapsed = (time.perf_counter() - start) / runs * 1000
+    print(f"  {label:<36} {elapsed:8.3f} ms")
+
+
+def run_queries(db, users: int, teams: int, event_ids: list, runs: int):
+    timed("user by email", runs, lambda: db["user"].find_one(
+        {"email": f"user{random.randrange(users)}@bench.test"}))
+    timed("team by event_id + team_name", runs, lambda: db["team"].find_one(
+        {"event_id": random.choice(event_ids), "team_name": f"team{random.randrange(teams)}"}))
+    timed("team by event_id + team_code", runs, lambda: db["team"].find_one(
+        {"event_id": random.choice(event_ids), "team_code": "ZZZZZ"}))
+    timed("registrations by event_id", runs, lambda: db["registration"].count_documents(
+        {"event_id": random.choice(event_ids)}))
+    timed("registration by event_id + user_id", runs, lambda: db["registration"].find_one(
+        {"event_id": random.choice(event_ids), "user_id": ObjectId()}))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=20000)
+    parser.add_argument("--events", type=int, default=30)
+    parser.add_argument("--teams", type=int, default=3000)
+    parser.add_argument("--runs", type=int, default=200)
+    args = parser.parse_args()
+
+    client = MongoClient(uri)
+    client.drop_database(BENCH_DB)
+    db = client[BENCH_DB]
+
+    try:
+        event_ids = seed(db, args.users, args.events, args.teams)
+
+        print("without indexes")
+        run_queries(db, args.users, args.teams, event_ids, args.runs)
+
+        ensure_session_indexes(db)
+
+        print("with indexes")
+        run_queries(db, args.users, args.teams, event_ids, args.runs)
+    finally:
+        client.drop_database(BENCH_DB)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+# Pins the cost of /users/registered: the number of MongoDB commands per
+# call must not grow with the number of teams in the session, and the
+# latency should stay flat.
+#
+#   python -m benchmarks.registered_lookups --sizes 100 1000 5000
+import os
+
+# Command counting rides on the transfer listener, which is wired into
+# the clients when database.py is imported
+os.environ["DB_TRANSFER_STATS"] = "on"
+
+import argparse
+import asyncio
+import sys
+import time
+from database import client, credentials_db, pin_session
+from utils.indexes import ensure_session_indexes
+from utils.transfer import current_transfer
+from verify.event_cache import event_cache
+from routes.user import load_registered_events
+
+BENCH_DB = "bench_registered"
+MAX_COMMANDS = 3
+EVENTS = 5
+TEAM_SIZE = 4
+
+
+def seed(db, teams: int):
+    event_ids = db["event"].insert_many([
+        {"event_name": f"event {i}"} for i in range(EVENTS)
+    ]).inserted_ids
+
+    people = db["user"].insert_many([
+        {"email": f"user{i}@bench.test", "name": f"user {i}"}
+        for i in range(teams * TEAM_SIZE)
+    ]).inserted_ids
+
+    team_docs = []
+    registrations = []
+    for i in range(teams):
+        event_id = event_ids[i % EVENTS]
+        leader, *members = people[i * TEAM_SIZE:(i + 1) * TEAM_SIZE]
+        team_docs.append({
+            "event_id": event_id,
+            "team_name": f"team {i}",
+            "team_code": f"T{i}",
+            "leader_id": leader,
+            "members": members
+        })
+    team_ids = db["team"].insert_many(team_docs).inserted_ids
+
+    for team_id, team in zip(team_ids, team_docs):
+        for person in [team["leader_id"], *team["members"]]:
+            registrations.append({"event_id": team["event_id"], "user_id": person, "team_id": team_id})
+    db["registration"].insert_many(registrations)
+
+    # The measured user leads the first team
+    return people[0]
+
+
+async def measure(user_id, calls: int) -> tuple[int, float]:
+    await event_cache.all_async()
+
+    transfer = {"commands": 0, "bytes": 0}
+    token = current_transfer.set(transfer)
+    try:
+        start = time.perf_counter()
+        for _ in range(calls):
+            await load_registered_events(user_id)
+        elapsed = time.perf_counter() - start
+    finally:
+        current_transfer.reset(token)
+
+    return transfer["commands"] // calls, elapsed / calls * 1000
+
+
+async def run(sizes: list[int], calls: int) -> bool:
+    # One event loop for every size, the async client is bound to it
+    failed = False
+    for teams in sizes:
+        client.drop_database(BENCH_DB)
+        db = client[BENCH_DB]
+        ensure_session_indexes(db)
+        user_id = seed(db, teams)
+        event_cache.invalidate()
+
+        commands, latency = await measure(user_id, calls)
+        print(f"{teams:6d} teams  {commands} commands/call  {latency:8.2f} ms/call")
+        failed = failed or commands > MAX_COMMANDS
+    return failed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 5000])
+    parser.add_argument("--calls", type=int, default=50)
+    args = parser.parse_args()
+
+    pin_session(BENCH_DB)
+    try:
+        failed = asyncio.run(run(args.sizes, args.calls))
+    finally:
+        pin_session(None)
+        client.drop_database(BENCH_DB)
+        credentials_db.drop_collection("admin_" + BENCH_DB)
+
+    if failed:
+        print(f"more than {MAX_COMMANDS} commands per call")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+# Compares one insert_one per registration against the group-commit
+# WriteBuffer used when REGISTRATION_BUFFER=on, for a burst of
+# concurrent registrations.
+#
+#   python -m benchmarks.registration_writes --registrations 5000 --concurrency 1000
+import argparse
+import asyncio
+import time
+from bson import ObjectId
+from pymongo import AsyncMongoClient
+from utils.reader import uri
+from utils.indexes import SESSION_INDEXES
+from utils.write_buffer import WriteBuffer
+
+BENCH_DB = "bench_registration_writes"
+
+
+async def reset(db):
+    await db.drop_collection("registration")
+    await db["registration"].create_indexes(SESSION_INDEXES["registration"])
+
+
+def registrations(count: int) -> list[dict]:
+    event_id = ObjectId()
+    return [
+        {"event_id": event_id, "user_id": ObjectId(), "registered_on": "bench"}
+        for _ in range(count)
+    ]
+
+
+async def burst(write, docs: list[dict], concurrency: int) -> float:
+    limit = asyncio.Semaphore(concurrency)
+
+    async def one(doc: dict):
+        async with limit:
+            await write(doc)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(doc) for doc in docs))
+    return time.perf_counter() - start
+
+
+async def run(count: int, concurrency: int):
+    client = AsyncMongoClient(uri)
+    db = client[BENCH_DB]
+    collection = db["registration"]
+
+    try:
+        await reset(db)
+        elapsed = await burst(collection.insert_one, registrations(count), concurrency)
+        print(f"insert_one   {count / elapsed:10.1f} writes/s")
+
+        await reset(db)
+        buffer = WriteBuffer()
+
+        async def buffered(doc: dict):
+            await buffer.submit(collection, doc)
+
+        elapsed = await burst(buffered, registrations(count), concurrency)
+        await buffer.close()
+        stats = buffer.stats()
+        print(f"bulk_write   {count / elapsed:10.1f} writes/s  "
+              f"({stats['batches']} batches, avg {stats['avg_batch']}, max {stats['largest_batch']})")
+
+        written = await collection.count_documents({})
+        if written != count:
+            print(f"expected {count} documents, found {written}")
+    finally:
+        await client.drop_database(BENCH_DB)
+        await client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--registrations", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=1000)
+    args = parser.parse_args()
+
+    asyncio.run(run(args.registrations, args.concurrency))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+# Load test for capped events: hundreds of concurrent registrants (with
+# duplicates and unregister churn) race for a few seats through the real
+# register path. Fails if an event ever ends up oversold.
+#
+#   python -m benchmarks.seat_contention --capacity 50 --registrants 500
+import argparse
+import asyncio
+import random
+import sys
+import time
+from database import client, credentials_db, pin_session, current_async_registration_collection, current_async_seats_collection
+from utils.seats import init_seats, release_seat
+from routes.user import push_registration
+
+BENCH_DB = "bench_seats"
+
+
+def seed(db, registrants: int, capacity: int):
+    user_ids = db["user"].insert_many([
+        {"email": f"user{i}@bench.test"} for i in range(registrants)
+    ]).inserted_ids
+    event_id = db["event"].insert_one({
+        "event_name": "bench",
+        "event_capacity": capacity
+    }).inserted_id
+    init_seats(db["event_seats"], event_id, capacity)
+    return user_ids, event_id
+
+
+async def unregister(event_id, user_id):
+    # Same steps as /users/unregister-event
+    registration = await current_async_registration_collection().find_one_and_delete(
+        {"event_id": event_id, "user_id": user_id},
+        projection={"seat_shard": 1}
+    )
+    if registration:
+        await release_seat(current_async_seats_collection(), event_id, registration.get("seat_shard"))
+
+
+async def registrant(event_id, user_id, churn: float) -> int:
+    registered = await push_registration(user_id, event_id, "bench")
+    # A retried request from the same user must not take a second seat
+    if random.random() < 0.1:
+        await push_registration(user_id, event_id, "bench")
+    if registered and random.random() < churn:
+        await unregister(event_id, user_id)
+        return 0
+    return int(registered)
+
+
+async def run(user_ids: list, event_id, churn: float) -> tuple[int, float]:
+    start = time.perf_counter()
+    results = await asyncio.gather(*(registrant(event_id, uid, churn) for uid in user_ids))
+    return sum(results), time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--capacity", type=int, default=50)
+    parser.add_argument("--registrants", type=int, default=500)
+    parser.add_argument("--churn", type=float, default=0.2)
+    args = parser.parse_args()
+
+    client.drop_database(BENCH_DB)
+    pin_session(BENCH_DB)
+
+    try:
+        db = client[BENCH_DB]
+        user_ids, event_id = seed(db, args.registrants, args.capacity)
+
+        held, elapsed = asyncio.run(run(user_ids, event_id, args.churn))
+
+        registrations = db["registration"].count_documents({"event_id": event_id})
+        remaining = sum(s["remaining"] for s in db["event_seats"].find({"event_id": event_id}))
+
+        print(f"{args.registrants} registrants, capacity {args.capacity}, {elapsed:.2f}s")
+        print(f"registrations {registrations}, seats left {remaining}, held {held}")
+
+        if registrations > args.capacity or registrations + remaining != args.capacity:
+            print("OVERSOLD")
+            sys.exit(1)
+        print("ok")
+    finally:
+        pin_session(None)
+        client.drop_database(BENCH_DB)
+        credentials_db.drop_collection("admin_" + BENCH_DB)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,45 +1,171 @@
-
 from pymongo.mongo_client import MongoClient
+from pymongo import AsyncMongoClient
 from pymongo.server_api import ServerApi
-from gridfs import GridFS
+from gridfs import GridFS, AsyncGridFS
 from datetime import datetime
+from threading import Lock, Thread
+import time
 from utils.reader import uri
+from utils.indexes import safe_ensure_indexes
+from utils.transfer import transfer_listeners
 
-client = MongoClient(uri, server_api=ServerApi('1'))
+client = MongoClient(uri, server_api=ServerApi('1'), event_listeners=transfer_listeners())
+credentials_db = client["credentials"]
 
-def current_session():
-    end_year = datetime.now().year if datetime.now().month < 7 else datetime.now().year + 1
+async_client = AsyncMongoClient(uri, server_api=ServerApi('1'), event_listeners=transfer_listeners())
+async_credentials_db = async_client["credentials"]
+
+
+class SessionHandles:
+
+    def __init__(self, db_name: str, valid_until: float):
+        self.db_name = db_name
+        self.valid_until = valid_until
+        self.db = client[db_name]
+        self.user = self.db["user"]
+        self.event = self.db["event"]
+        self.team = self.db["team"]
+        self.registration = self.db["registration"]
+        self.seats = self.db["event_seats"]
+        self.fs = GridFS(self.db)
+        self.admin = credentials_db["admin_"+db_name]
+
+        self.async_db = async_client[db_name]
+        self.async_user = self.async_db["user"]
+        self.async_event = self.async_db["event"]
+        self.async_team = self.async_db["team"]
+        self.async_registration = self.async_db["registration"]
+        self.async_seats = self.async_db["event_seats"]
+        self.async_fs = AsyncGridFS(self.async_db)
+        self.async_admin = async_credentials_db["admin_"+db_name]
+
+
+_handles: SessionHandles | None = None
+_pinned_session: str | None = None
+_handles_lock = Lock()
+# The session whose indexes are being built before it is swapped in
+_bootstrapping: str | None = None
+_archive_fs: dict = {}
+
+
+def session_for(now: datetime) -> tuple[str, float]:
+    # Sessions roll over on the 1st of July
+    end_year = now.year if now.month < 7 else now.year + 1
     start_yr = end_year - 1
     db_name = str(start_yr)+"_"+str(end_year)
-    return db_name
+    rollover = datetime(end_year, 7, 1).timestamp()
+    return db_name, rollover
+
+
+def _bootstrap(handles: SessionHandles):
+    global _handles, _bootstrapping
+    safe_ensure_indexes(handles, current_superadmin_collection())
+    with _handles_lock:
+        # Unless pin_session() replaced the handles meanwhile
+        if _bootstrapping == handles.db_name:
+            _handles = handles
+            _bootstrapping = None
+
+
+def current_handles() -> SessionHandles:
+    global _handles, _bootstrapping
+    handles = _handles
+    if handles is not None and (time.time() < handles.valid_until or _bootstrapping is not None):
+        return handles
+
+    with _handles_lock:
+        if _handles is not None and (time.time() < _handles.valid_until or _bootstrapping is not None):
+            return _handles
+
+        if _pinned_session:
+            handles = SessionHandles(_pinned_session, float("inf"))
+        else:
+            handles = SessionHandles(*session_for(datetime.now()))
+
+        # A new session database gets its indexes before first use
+        if _handles is None:
+            # Nothing to serve meanwhile, as at startup
+            safe_ensure_indexes(handles, current_superadmin_collection())
+            _handles = handles
+            return _handles
+
+        # At the rollover the index builds run off the request path, and
+        # async handlers off the event loop; the closing session answers
+        # until they are done
+        _bootstrapping = handles.db_name
+        Thread(target=_bootstrap, args=(handles,), daemon=True, name="session-bootstrap").start()
+        return _handles
+
+
+def pin_session(db_name: str | None):
+    # Lets tests and scripts work against a fixed session, None unpins
+    global _handles, _pinned_session, _bootstrapping
+    with _handles_lock:
+        _pinned_session = db_name
+        _handles = None
+        _bootstrapping = None
+
+
+def current_session():
+    return current_handles().db_name
 
 def get_current_db():
-    db_name = current_session()
-    return client[db_name]
+    return current_handles().db
 
 
 def current_user_collection():
-    return get_current_db()["user"]
+    return current_handles().user
 
 def current_event_collection():
-    return get_current_db()["event"]
+    return current_handles().event
 
 def current_team_collection():
-    return get_current_db()["team"]
+    return current_handles().team
+
+def current_registration_collection():
+    return current_handles().registration
+
+def current_seats_collection():
+    return current_handles().seats
 
 def current_fs_collection():
-    return GridFS(get_current_db())
+    return current_handles().fs
+
+
+def session_fs(db_name: str) -> GridFS:
+    fs = _archive_fs.get(db_name)
+    if fs is None:
+        fs = _archive_fs.setdefault(db_name, GridFS(client[db_name]))
+    return fs
 
 
 def current_admin_collection():
-    cred_db = client["credentials"]
-    admin_collection = cred_db["admin_"+current_session()]
-    return admin_collection
+    return current_handles().admin
 
 def current_superadmin_collection():
-    cred_db = client["credentials"]
-    superadmin_collection = cred_db["superadmin"]
-    return superadmin_collection
+    return credentials_db["superadmin"]
+
+
+def current_async_user_collection():
+    return current_handles().async_user
+
+def current_async_event_collection():
+    return current_handles().async_event
+
+def current_async_team_collection():
+    return current_handles().async_team
+
+def current_async_registration_collection():
+    return current_handles().async_registration
+
+def current_async_seats_collection():
+    return current_handles().async_seats
 
+def current_async_fs_collection():
+    return current_handles().async_fs
 
+def current_async_admin_collection():
+    return current_handles().async_admin
 
+def current_async_superadmin_collection():
+    return async_credentials_db["superadmin"]
@@ -1,9 +1,29 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
 from routes import user, admin, event, auth, superadmin, team, remarks, rootTeam, rootEvent, rootUser
 from fastapi.middleware.cors import CORSMiddleware
-from utils.reader import Frontend
+from utils.reader import Frontend, DB_TRANSFER_STATS
+from database import client, current_handles
+from utils.pattern import session_catalog
+from utils.migrations import migrate_sessions
+from utils.snapshots import session_snapshots
+from utils.write_buffer import registration_buffer
+from utils.transfer import current_transfer, transfer_stats
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Builds the session handles, which bootstraps the indexes
+    current_handles()
+    migrate_sessions(session_catalog.session_dbs(), client)
+    # Snapshots closed sessions that have none yet, loads the rest
+    session_snapshots.build_closed(session_catalog.session_dbs())
+    yield
+    # Buffered registrations are acked only once written, flush the rest
+    await registration_buffer.close()
+
+
+app = FastAPI(lifespan=lifespan)
 
 # Allow multiple origins (development and production)
 allowed_origins = [
@@ -13,6 +33,22 @@ allowed_origins = [
     "https://ieee-synapse.vercel.app"
 ]
 
+if DB_TRANSFER_STATS:
+    @app.middleware("http")
+    async def measure_db_transfer(request: Request, call_next):
+        transfer = {"commands": 0, "bytes": 0}
+        token = current_transfer.set(transfer)
+        try:
+            response = await call_next(request)
+        finally:
+            current_transfer.reset(token)
+
+        route = request.scope.get("route")
+        if route is not None:
+            transfer_stats.record(f"{request.method} {route.path}", transfer)
+        return response
+
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=allowed_origins,  
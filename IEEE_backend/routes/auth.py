@@ -15,7 +15,7 @@ def google_auth_user(data: dict):
     email = idinfo["email"].lower()
 
     user_collection = current_user_collection()
-    user = user_collection.find_one({"email": email})
+    user = user_collection.find_one({"email": email}, {"_id": 1})
     if user:
         user_id = str(user["_id"])
     else:
@@ -50,7 +50,7 @@ def google_auth_admin(data: dict):
     idinfo = verify_google_token(data)
     email = idinfo["email"]
 
-    admin, admin_id, email = verify_admin_by_email(email, "Y")
+    admin, admin_id, email = verify_admin_by_email(email, "Y", ["_id"])
 
 
     today=date.today()
@@ -76,7 +76,7 @@ def google_auth_superadmin(data: dict):
     idinfo = verify_google_token(data)
     email = idinfo["email"]
 
-    superadmin, superadmin_id, email = verify_superadmin_by_email(email, "Y")
+    superadmin, superadmin_id, email = verify_superadmin_by_email(email, "Y", ["_id"])
 
 
     today=date.today()
@@ -1,13 +1,22 @@
-from fastapi import APIRouter, UploadFile, File, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.exceptions import RequestValidationError
+from pydantic import ValidationError
 from bson import ObjectId
-from database import current_event_collection, current_fs_collection, current_team_collection, current_user_collection
+from pymongo import ReturnDocument
+from database import current_session, current_event_collection, current_fs_collection, current_async_fs_collection, current_team_collection, current_registration_collection, current_seats_collection
 from schemas.event import EventCreate
 from verify.token import verify_access_token
-from verify.sudo import verify_sudo_payload
-from verify.event import verify_event
+from verify.sudo import verify_sudo_payload, verify_sudo_payload_async
+from verify.event import verify_event, verify_event_async
+from verify.event_cache import event_cache
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from datetime import date, time, datetime
 from utils.time import IST
+from utils.seats import init_seats, resize_seats, drop_seats
+from utils.images import forget_image
+from utils.variants import generate_variants, delete_variants
+from utils.uploads import UploadedImage, read_event_form
 
 
 
@@ -17,6 +26,22 @@ router = APIRouter(prefix="/root/events", tags=["Events"])
 
 MAX_IMAGE_SIZE = 50 * 1024
 
+# create_event and update_event parse their own multipart body, this
+# documents it the way Form() and File() parameters would
+EVENT_FORM_OPENAPI = {
+    "requestBody": {
+        "required": True,
+        "content": {"multipart/form-data": {"schema": {
+            "type": "object",
+            "properties": {
+                **EventCreate.model_json_schema()["properties"],
+                "image": {"type": "string", "format": "binary"}
+            },
+            "required": EventCreate.model_json_schema().get("required", [])
+        }}}
+    }
+}
+
 
 
 
@@ -46,92 +71,98 @@ def normalize_event_dates(data: dict):
 
 
 
-@router.post("")
-def create_event(
-    event: EventCreate = Depends(EventCreate.convert_to_form),
-    image: UploadFile | None = File(None),
+async def read_event_upload(request: Request) -> tuple[EventCreate, UploadedImage | None]:
+    fs = current_async_fs_collection()
+    fields, image = await read_event_form(request, fs, MAX_IMAGE_SIZE)
+
+    # Empty inputs count as not sent, as with Form()
+    fields = {k: v for k, v in fields.items() if v != "" and k in EventCreate.model_fields}
+    try:
+        event = EventCreate.model_validate(fields)
+    except ValidationError as e:
+        if image:
+            await fs.delete(image.file_id)
+        raise RequestValidationError([{**err, "loc": ("body", *err["loc"])} for err in e.errors()])
+
+    return event, image
+
+
+
+@router.post("", openapi_extra=EVENT_FORM_OPENAPI)
+async def create_event(
+    request: Request,
     credentials: HTTPAuthorizationCredentials = Depends(security)
 ):
     token = credentials.credentials
     payload = verify_access_token(token)
-    verify_sudo_payload(payload)
+    await verify_sudo_payload_async(payload)
+
+    # The body is only read once the caller is known to be allowed
+    event, image = await read_event_upload(request)
 
+    return await run_in_threadpool(insert_event, event, image)
+
+
+def insert_event(event: EventCreate, image: UploadedImage | None):
     event_data = event.model_dump(exclude_none=True)
     event_data = normalize_event_dates(event_data)
-    event_data["registered_user"] = []
 
-    if event_data["event_team_allowed"] == True:
-        event_data["registered_team"] = []
-        if event_data["event_team_size"]<=0:
+    if event_data.get("event_team_allowed") == True:
+        if event_data.get("event_team_size", 0)<=0:
             event_data["event_team_size"]=1
     else:
         event_data["event_team_size"]=0
 
     if image:
-
-        image.file.seek(0, 2)
-        size = image.file.tell()
-        image.file.seek(0)
-        if size > MAX_IMAGE_SIZE:
-            raise HTTPException(status_code=400, detail="Image size exceeds 50KB")
-
-        fs = current_fs_collection()
-        file_id = fs.put(
-            image.file,
-            filename=image.filename,
-            content_type=image.content_type
-        )
-        event_data["event_thumbnail_id"] = str(file_id)
+        generate_variants(current_fs_collection(), image.file_id, image.data)
+        event_data["event_thumbnail_id"] = str(image.file_id)
 
     event_data["created_on"] = datetime.now(IST).isoformat()
 
     event_collection = current_event_collection()
-    event_collection.insert_one(event_data)
+    event_id = event_collection.insert_one(event_data).inserted_id
+    event_cache.invalidate()
+
+    if event_data.get("event_capacity") is not None:
+        init_seats(current_seats_collection(), event_id, event_data["event_capacity"])
+
     return {"message": "Event created"}
 
 
 
 
 
-@router.patch("/{event_id}")
-def update_event(
+@router.patch("/{event_id}", openapi_extra=EVENT_FORM_OPENAPI)
+async def update_event(
+    request: Request,
     event_id: str,
-    event_data: EventCreate = Depends(EventCreate.convert_to_form),
-    image: UploadFile | None = File(None),
     credentials: HTTPAuthorizationCredentials = Depends(security)
 ):
     token = credentials.credentials
     payload = verify_access_token(token)
-    verify_sudo_payload(payload)
+    await verify_sudo_payload_async(payload)
 
-    event, event_id = verify_event(event_id)
+    event, event_id = await verify_event_async(event_id, ["event_thumbnail_id", "event_capacity"])
 
-    update_data = event_data.model_dump(exclude_none=True)
-    update_data = normalize_event_dates(update_data)
+    event_data, image = await read_event_upload(request)
 
-    if image:
-        image.file.seek(0, 2)
-        size = image.file.tell()
-        image.file.seek(0)
+    return await run_in_threadpool(apply_event_update, event, event_id, event_data, image)
 
-        if size > MAX_IMAGE_SIZE:
-            raise HTTPException(status_code=400, detail="Image size exceeds 50KB")
 
-        fs = current_fs_collection()
-        if "event_thumbnail_id" in event:
-            fs.delete(ObjectId(event["event_thumbnail_id"]))
+def apply_event_update(event: dict, event_id: ObjectId, event_data: EventCreate, image: UploadedImage | None):
+    update_data = event_data.model_dump(exclude_none=True)
+    update_data = normalize_event_dates(update_data)
 
-        file_id = fs.put(image.file)
-        update_data["event_thumbnail_id"] = str(file_id)
+    if image:
+        update_data["event_thumbnail_id"] = str(image.file_id)
 
     team_allowed = update_data.get("event_team_allowed")
 
     event_collection = current_event_collection()
     team_collection = current_team_collection()
-    user_collection = current_user_collection()
+    registration_collection = current_registration_collection()
 
     if team_allowed is True:
-        update_data["registered_team"] = []
         if update_data.get("event_team_size", 0) <= 0:
             update_data["event_team_size"] = 1
 
@@ -140,28 +171,51 @@ def update_event(
         team_collection.delete_many(
             {"event_id": event_id}
         )
-        user_collection.update_many(
-            {"registered_event.event_id": event_id},
-            {"$unset": {"registered_event.$[].team_id": ""}}
-        )
-        event_collection.update_one(
-            {"_id": event_id},
-            {"$unset": {"registered_team": ""},
-             "$unset": {"remarked_team": ""}}
+        registration_collection.update_many(
+            {"event_id": event_id},
+            {"$unset": {"team_id": ""}}
         )
 
         update_data["event_team_size"] = 0
 
+    old_capacity = event.get("event_capacity")
     if update_data:
-        result = event_collection.update_one(
+        # The capacity this write replaced, not the cached event's, so
+        # overlapping updates each shift the seats by their own delta
+        before = event_collection.find_one_and_update(
             {"_id": event_id},
-            {"$set": update_data}
+            {"$set": update_data},
+            projection={"event_capacity": 1, "event_thumbnail_id": 1},
+            return_document=ReturnDocument.BEFORE
         )
-    else:
-        result = None
+        event_cache.invalidate()
+        if before is None:
+            # Deleted since it was verified, the new upload has no owner
+            if image:
+                current_fs_collection().delete(image.file_id)
+            raise HTTPException(status_code=404, detail="Event not found")
+        old_capacity = before.get("event_capacity")
 
-    if result and result.matched_count == 0:
-        raise HTTPException(status_code=404, detail="Event not found")
+    if image:
+        # Only now that the event points at the new file
+        fs = current_fs_collection()
+        old_thumbnail_id = before.get("event_thumbnail_id")
+        if old_thumbnail_id:
+            fs.delete(ObjectId(old_thumbnail_id))
+            delete_variants(fs, ObjectId(old_thumbnail_id))
+            forget_image(current_session(), old_thumbnail_id)
+
+        generate_variants(fs, image.file_id, image.data)
+
+    new_capacity = update_data.get("event_capacity")
+    if new_capacity is not None and new_capacity != old_capacity:
+        resize_seats(
+            current_seats_collection(),
+            registration_collection,
+            event_id,
+            old_capacity,
+            new_capacity
+        )
 
     return {"message": "Event updated"}
 
@@ -181,34 +235,32 @@ def delete_event(
     payload = verify_access_token(token)
     verify_sudo_payload(payload)
 
-    event, event_id = verify_event(event_id)
+    event, event_id = verify_event(event_id, ["event_thumbnail_id"])
 
     event_collection = current_event_collection()
     team_collection = current_team_collection()
-    user_collection = current_user_collection()
+    registration_collection = current_registration_collection()
     fs = current_fs_collection()
 
     if "event_thumbnail_id" in event:
         fs.delete(ObjectId(event["event_thumbnail_id"]))
+        delete_variants(fs, ObjectId(event["event_thumbnail_id"]))
+        forget_image(current_session(), event["event_thumbnail_id"])
 
     team_collection.delete_many(
         {"event_id": event_id}
     )
 
-    user_collection.update_many(
-        {},
-        {
-            "$pull": {
-                "registered_event": {
-                    "event_id": event_id
-                }
-            }
-        }
+    registration_collection.delete_many(
+        {"event_id": event_id}
     )
 
+    drop_seats(current_seats_collection(), event_id)
+
     event_collection.delete_one(
         {"_id": event_id}
     )
+    event_cache.invalidate()
 
     return {
         "message": "Event deleted successfully",
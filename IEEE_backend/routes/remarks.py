@@ -1,9 +1,11 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from database import current_event_collection, current_user_collection, current_team_collection
+from database import current_event_collection, current_team_collection, current_registration_collection
 from verify.token import verify_access_token
 from verify.sudo import verify_sudo_payload
-from verify.event import verify_event, verify_eventRegistry
+from verify.event import verify_event
+from verify.event_cache import event_cache
 from verify.user import verify_user
+from verify.registration import verify_registration
 from verify.team import verify_team_by_id
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 
@@ -23,28 +25,19 @@ def create_user_remark(
     payload = verify_access_token(token)
     verify_sudo_payload(payload)
 
-    user, user_id,user_email=verify_user(user_id, user_email,"Y")
-    event, event_id=verify_event(event_id)
-    verify_eventRegistry(event_id, user_id, "Y", user, event)
+    user, user_id,user_email=verify_user(user_id, user_email,"Y", ["_id"])
+    event, event_id=verify_event(event_id, ["_id"])
+    registration = verify_registration(event_id, user_id, "Y")
 
-    user_collection = current_user_collection()
-    user_collection.update_one(
+    registration_collection = current_registration_collection()
+    registration_collection.update_one(
     {
-        "_id": user_id,
-        "registered_event.event_id": event_id
+        "event_id": event_id,
+        "user_id": user_id
     },
     {
         "$set": {
-            "registered_event.$.remark": remark
-        }
-    }
-    )
-    event_collection = current_event_collection()
-    event_collection.update_one(
-    {"_id": event_id},
-    {
-        "$addToSet": {
-            "remarked_user": user_id
+            "remark": remark
         }
     }
     )
@@ -63,34 +56,25 @@ def delete_user_remark(
     payload = verify_access_token(token)
     verify_sudo_payload(payload)
 
-    user, user_id,user_email=verify_user(user_id, user_email,"Y")
-    event, event_id=verify_event(event_id)
-    verify_eventRegistry(event_id, user_id, "Y", user, event)
+    user, user_id,user_email=verify_user(user_id, user_email,"Y", ["_id"])
+    event, event_id=verify_event(event_id, ["_id"])
+    registration = verify_registration(event_id, user_id, "Y")
 
-    if user_id not in event["remarked_user"]:
+    if registration.get("remark") is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="No remark for this user yet for this event"
         )
 
-    user_collection = current_user_collection()
-    user_collection.update_one(
+    registration_collection = current_registration_collection()
+    registration_collection.update_one(
     {
-        "_id": user_id,
-        "registered_event.event_id": event_id
+        "event_id": event_id,
+        "user_id": user_id
     },
     {
         "$unset": {
-            "registered_event.$.remark": ""
-        }
-    }
-    )
-    event_collection = current_event_collection()
-    event_collection.update_one(
-    {"_id": event_id},
-    {
-        "$pull": {
-            "remarked_user": user_id
+            "remark": ""
         }
     }
     )
@@ -108,7 +92,7 @@ def add_event_remark(
     payload = verify_access_token(token)
     verify_sudo_payload(payload)
 
-    event, event_id=verify_event(event_id)
+    event, event_id=verify_event(event_id, ["_id"])
 
     event_collection = current_event_collection()
     event_collection.update_one(
@@ -121,8 +105,8 @@ def add_event_remark(
         }
     }
     )
-    
-    
+    event_cache.invalidate()
+
     return {"message": "Remark added"}
 
 
@@ -135,7 +119,7 @@ def delete_event_remark(
     payload = verify_access_token(token)
     verify_sudo_payload(payload)
 
-    event, event_id=verify_event(event_id)
+    event, event_id=verify_event(event_id, ["remark"])
     if event.get("remark") == None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -153,7 +137,8 @@ def delete_event_remark(
         }
     }
     )
-    
+    event_cache.invalidate()
+
     return {"message": "Remark deleted"}
 
 
@@ -167,7 +152,7 @@ def add_team_remark(
     payload = verify_access_token(token)
     verify_sudo_payload(payload)
 
-    team, team_id=verify_team_by_id(team_id)
+    team, team_id=verify_team_by_id(team_id, ["_id"])
 
     team_collection = current_team_collection()
     team_collection.update_one(
@@ -180,15 +165,6 @@ def add_team_remark(
         }
     }
     )
-    event_collection = current_event_collection()
-    event_collection.update_one(
-    {"_id": team["event_id"]},
-    {
-        "$addToSet": {
-            "remarked_team": team_id
-        }
-    }
-    )
     
     return {"message": "Remark added"}
 
@@ -202,7 +178,7 @@ def delete_team_remark(
     payload = verify_access_token(token)
     verify_sudo_payload(payload)
 
-    team, team_id=verify_team_by_id(team_id)
+    team, team_id=verify_team_by_id(team_id, ["remark"])
     if team.get("remark") == None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -220,15 +196,6 @@ def delete_team_remark(
         }
     }
     )
-    event_collection = current_event_collection()
-    event_collection.update_one(
-    {"_id": team["event_id"]},
-    {
-        "$pull": {
-            "remarked_team": team_id
-        }
-    }
-    )
     
     return {"message": "Remark deleted"}
 
@@ -1,87 +1,99 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from verify.token import verify_access_token
 from verify.sudo import verify_sudo_payload
-from utils.pattern import verify_session_db, DB_PATTERN
-from fastapi.responses import StreamingResponse
+from utils.pattern import verify_session_db, session_catalog
+from utils.snapshots import session_snapshots
+from utils.paging import Page, page_params, has_field
+from utils.images import image_response
+from utils.signed_urls import sign_image_url
 from bson import ObjectId
-from database import client
-from gridfs import GridFS
+from database import client, session_fs
 
 security = HTTPBearer()
 router = APIRouter(prefix="/root/getEvent", tags=["GetEvent"])
 
+EVENT_SORT_FIELDS = {"date": "event_date", "name": "event_name"}
 
 
 
 
+def count_by_event(collection, event_ids: list | None = None) -> dict:
+    # Per event: number of documents and how many of them carry a remark
+    match = [{"$match": {"event_id": {"$in": event_ids}}}] if event_ids is not None else []
+    return {
+        row["_id"]: row
+        for row in collection.aggregate([
+            *match,
+            {"$group": {
+                "_id": "$event_id",
+                "count": {"$sum": 1},
+                "remarked": {"$sum": {
+                    "$cond": [{"$ifNull": ["$remark", False]}, 1, 0]
+                }}
+            }}
+        ])
+    }
 
-@router.get("/all-events")
-def get_all_events_all_sessions(
-    credentials: HTTPAuthorizationCredentials = Depends(security)
-):
-    token = credentials.credentials
-    payload = verify_access_token(token)
-    verify_sudo_payload(payload)
 
-    result = {}
 
-    db_names = client.list_database_names()
 
-    for db_name in db_names:
-        if not DB_PATTERN.match(db_name):
-            continue
+@session_snapshots.view("all_events")
+def session_events_summary(db) -> dict:
+    events_cursor = db["event"].find(
+        {},
+        {
+            "event_name": 1,
+            "event_date": 1,
+            "remark": 1
+        }
+    )
 
-        try:
-            session_db_name = verify_session_db(db_name)
-        except Exception:
-            continue
+    user_counts = count_by_event(db["registration"])
+    team_counts = count_by_event(db["team"])
 
-        db = client[session_db_name]
-        event_collection = db["event"]
-
-        events_cursor = event_collection.find(
-            {},
-            {
-                "event_name": 1,
-                "event_date": 1,
-                "registered_user": 1,
-                "registered_team": 1,
-                "remarked_user": 1,
-                "remarked_team": 1,
-                "remark": 1
-            }
-        )
-
-        events = []
-        for event in events_cursor:
-            events.append({
-                "event_id": str(event["_id"]),
-                "event_name": event.get("event_name"),
-                "event_date": event.get("event_date"),
-                "no_of_registered_user": len(event.get("registered_user", [])),
-                "no_of_registered_team": len(event.get("registered_team", [])),
-                "no_of_remarked_user": len(event.get("remarked_user", [])),
-                "no_of_remarked_team": len(event.get("remarked_team", [])),
-                "remark": event.get("remark")
-            })
-
-        result[session_db_name] = {
-            "count": len(events),
-            "data": events
-        }
+    events = []
+    for event in events_cursor:
+        users = user_counts.get(event["_id"], {})
+        teams = team_counts.get(event["_id"], {})
+        events.append({
+            "event_id": str(event["_id"]),
+            "event_name": event.get("event_name"),
+            "event_date": event.get("event_date"),
+            "no_of_registered_user": users.get("count", 0),
+            "no_of_registered_team": teams.get("count", 0),
+            "no_of_remarked_user": users.get("remarked", 0),
+            "no_of_remarked_team": teams.get("remarked", 0),
+            "remark": event.get("remark")
+        })
 
     return {
-        "success": True,
-        "data": result
+        "count": len(events),
+        "data": events
     }
 
 
 
 
+@router.get("/all-events")
+def get_all_events_all_sessions(
+    allow_partial: bool = False,
+    credentials: HTTPAuthorizationCredentials = Depends(security)
+):
+    token = credentials.credentials
+    payload = verify_access_token(token)
+    verify_sudo_payload(payload)
+
+    return session_snapshots.response("all_events", session_catalog.session_dbs(), allow_partial)
+
+
+
+
 @router.get("/{year}")
 def get_all_events_of_year(
     year: str,
+    has_remark: bool | None = None,
+    page: Page = Depends(page_params(EVENT_SORT_FIELDS)),
     credentials: HTTPAuthorizationCredentials = Depends(security)
 ):
     token = credentials.credentials
@@ -92,29 +104,38 @@ def get_all_events_of_year(
     db = client[year]
     event_collection = db["event"]
 
-    events_cursor = event_collection.find(
-        {},
+    query = {}
+    if has_remark is not None:
+        query.update(has_field("remark", has_remark))
+
+    page_events = page.find(
+        event_collection,
+        query,
         {
             "event_name": 1,
             "event_date": 1,
-            "registered_user": 1,
-            "registered_team": 1,
-            "remarked_user": 1,
-            "remarked_team": 1
+            "remark": 1
         }
     )
 
+    # Counted for this page's events only
+    event_ids = [event["_id"] for event in page_events]
+    user_counts = count_by_event(db["registration"], event_ids)
+    team_counts = count_by_event(db["team"], event_ids)
+
     events = []
 
-    for event in events_cursor:
+    for event in page_events:
+        users = user_counts.get(event["_id"], {})
+        teams = team_counts.get(event["_id"], {})
         events.append({
             "event_id": str(event["_id"]),
             "event_name": event.get("event_name"),
             "event_date": event.get("event_date"),
-            "no_of_registered_user": len(event.get("registered_user", [])),
-            "no_of_registered_team": len(event.get("registered_team", [])),
-            "no_of_remarked_user": len(event.get("remarked_user", [])),
-            "no_of_remarked_team": len(event.get("remarked_team", [])),
+            "no_of_registered_user": users.get("count", 0),
+            "no_of_registered_team": teams.get("count", 0),
+            "no_of_remarked_user": users.get("remarked", 0),
+            "no_of_remarked_team": teams.get("remarked", 0),
             "remark": event.get("remark")
         })
 
@@ -122,32 +143,26 @@ def get_all_events_of_year(
         "success": True,
         "year": year,
         "count": len(events),
-        "data": events
+        "data": events,
+        "next": page.next
     }
 
 
 @router.get("/image/{year}/{image_id}")
 def get_archive_image(
+    request: Request,
     year: str,
     image_id: str,
+    size: str | None = None,
     credentials: HTTPAuthorizationCredentials = Depends(security)
 ):
     token = credentials.credentials
     payload = verify_access_token(token)
     verify_sudo_payload(payload)  # sudo check
 
-    db = client[year]
-
-    archive_fs = GridFS(db)
-    try:
-        grid_out = archive_fs.get(ObjectId(image_id))
-    except Exception:
-        raise HTTPException(status_code=404, detail="Image not found")
+    year = verify_session_db(year)
 
-    return StreamingResponse(
-        grid_out,
-        media_type=grid_out.content_type or "image/jpeg"
-    )
+    return image_response(request, year, session_fs(year), image_id, size)
 
 
 
@@ -167,6 +182,7 @@ def get_event_details(
     event_collection = db["event"]
     user_collection = db["user"]
     team_collection = db["team"]
+    registration_collection = db["registration"]
 
     if not ObjectId.is_valid(event_id):
         raise HTTPException(status_code=400, detail="Invalid event_id")
@@ -176,31 +192,25 @@ def get_event_details(
     if not event:
         raise HTTPException(status_code=404, detail="Event not found")
 
-    registered_user_ids = event.get("registered_user", [])
-    registered_team_ids = event.get("registered_team", [])
-
-    remarked_user_ids = event.get("remarked_user", [])
-    remarked_team_ids = event.get("remarked_team", [])
+    registrations = list(registration_collection.find({"event_id": event_oid}))
 
     users_cursor = user_collection.find(
-        {"_id": {"$in": registered_user_ids}},
-        {"_id": 1, "email": 1, "name": 1, "registered_event": 1}
+        {"_id": {"$in": [reg["user_id"] for reg in registrations]}},
+        {"_id": 1, "email": 1, "name": 1}
     )
     user_map = {u["_id"]: u for u in users_cursor}
 
     teams_cursor = team_collection.find(
-        {"_id": {"$in": registered_team_ids}},
+        {"event_id": event_oid},
         {"_id": 1, "team_name": 1, "registered_on": 1, "remark":1}
     )
-    team_map = {t["_id"]: t for t in teams_cursor}
 
     users_list = []
-    for uid in registered_user_ids:
+    for reg in registrations:
+        uid = reg["user_id"]
         user = user_map.get(uid)
         if not user:
             continue
-
-        reg = next((r for r in user.get("registered_event", []) if r.get("event_id") == event_oid), {})
         
         users_list.append({
             "user_id": str(uid),
@@ -211,10 +221,8 @@ def get_event_details(
         })
 
     teams_list = []
-    for tid in registered_team_ids:
-        team = team_map.get(tid)
-        if not team:
-            continue
+    for team in teams_cursor:
+        tid = team["_id"]
 
         teams_list.append({
             "team_id": str(tid),
@@ -230,6 +238,7 @@ def get_event_details(
     event.pop("remarked_user",None)
     event.pop("remarked_team",None)
     event["event_thumbnail_id"] = str(event.get("event_thumbnail_id"))
+    event["event_thumbnail_url"] = sign_image_url(year, event["event_thumbnail_id"])
 
 
 
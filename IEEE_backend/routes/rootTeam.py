@@ -2,87 +2,81 @@ from fastapi import APIRouter, Depends, HTTPException
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from verify.token import verify_access_token
 from verify.sudo import verify_sudo_payload
-from utils.pattern import verify_session_db, DB_PATTERN
+from utils.pattern import verify_session_db, session_catalog
+from utils.snapshots import session_snapshots
+from utils.paging import Page, page_params, has_field
 from bson import ObjectId
 from database import client
 
 security = HTTPBearer()
 router = APIRouter(prefix="/root/getTeam", tags=["GetTeam"])
 
+TEAM_SORT_FIELDS = {"name": "team_name", "registered_on": "registered_on"}
+
+
+
+@session_snapshots.view("all_teams")
+def session_teams_summary(db) -> dict:
+    team_collection = db["team"]
+    user_collection = db["user"]
+    event_collection = db["event"]
+
+    teams = list(team_collection.find({}))
+    if not teams:
+        return {"count": 0, "data": []}
+
+    event_ids = list({team["event_id"] for team in teams})
+    leader_ids = list({team["leader_id"] for team in teams})
+
+    events = {e["_id"]: e.get("event_name") for e in event_collection.find(
+        {"_id": {"$in": event_ids}}, {"_id": 1, "event_name": 1})}
+    leaders = {u["_id"]: {"name": u.get("name"), "email": u.get("email")} for u in user_collection.find(
+        {"_id": {"$in": leader_ids}}, {"_id": 1, "name": 1, "email": 1})}
+
+    session_result = []
+    for team in teams:
+        tid = team["_id"]
+        eid = team["event_id"]
+        lid = team["leader_id"]
+        members = team.get("members", [])
+        remark = team.get("remark")
+
+        session_result.append({
+            "team_id": str(tid),
+            "team_name": team.get("team_name"),
+            "event_name": events.get(eid),
+            "leader_name": leaders.get(lid, {}).get("name"),
+            "leader_email": leaders.get(lid, {}).get("email"),
+            "number_of_members": len(members),
+            "remark": remark
+        })
+
+    return {
+        "count": len(session_result),
+        "data": session_result
+    }
+
 
 
 @router.get("/all-teams")
 def get_all_teams_all_sessions(
+    allow_partial: bool = False,
     credentials: HTTPAuthorizationCredentials = Depends(security)
 ):
     token = credentials.credentials
     payload = verify_access_token(token)
     verify_sudo_payload(payload)
 
-    result = {}
-
-    db_names = client.list_database_names()
-
-    for db_name in db_names:
-        if not DB_PATTERN.match(db_name):
-            continue
-
-        try:
-            session_db_name = verify_session_db(db_name)
-        except Exception:
-            continue
-
-        db = client[session_db_name]
-        team_collection = db["team"]
-        user_collection = db["user"]
-        event_collection = db["event"]
-
-        teams = list(team_collection.find({}))
-        if not teams:
-            result[session_db_name] = {"count": 0, "data": []}
-            continue
-
-        event_ids = list({team["event_id"] for team in teams})
-        leader_ids = list({team["leader_id"] for team in teams})
-
-        events = {e["_id"]: e.get("event_name") for e in event_collection.find(
-            {"_id": {"$in": event_ids}}, {"_id": 1, "event_name": 1})}
-        leaders = {u["_id"]: {"name": u.get("name"), "email": u.get("email")} for u in user_collection.find(
-            {"_id": {"$in": leader_ids}}, {"_id": 1, "name": 1, "email": 1})}
-
-        session_result = []
-        for team in teams:
-            tid = team["_id"]
-            eid = team["event_id"]
-            lid = team["leader_id"]
-            members = team.get("members", [])
-            remark = team.get("remark")
-
-            session_result.append({
-                "team_id": str(tid),
-                "team_name": team.get("team_name"),
-                "event_name": events.get(eid),
-                "leader_name": leaders.get(lid, {}).get("name"),
-                "leader_email": leaders.get(lid, {}).get("email"),
-                "number_of_members": len(members),
-                "remark": remark
-            })
-
-        result[session_db_name] = {
-            "count": len(session_result),
-            "data": session_result
-        }
-
-    return {
-        "success": True,
-        "data": result
-    }
+    return session_snapshots.response("all_teams", session_catalog.session_dbs(), allow_partial)
 
 
 
 @router.get("/{year}")
 def get_all_teams_of_year(
     year: str,
+    event_id: str | None = None,
+    has_remark: bool | None = None,
+    page: Page = Depends(page_params(TEAM_SORT_FIELDS)),
     credentials: HTTPAuthorizationCredentials = Depends(security)
 ):
     token = credentials.credentials
@@ -96,10 +90,22 @@ def get_all_teams_of_year(
     user_collection = db["user"]
     event_collection = db["event"]
 
-    teams = list(team_collection.find({}))
+    query = {}
+    if event_id is not None:
+        if not ObjectId.is_valid(event_id):
+            raise HTTPException(status_code=400, detail="Invalid event_id")
+        query["event_id"] = ObjectId(event_id)
+    if has_remark is not None:
+        query.update(has_field("remark", has_remark))
+
+    teams = page.find(
+        team_collection,
+        query,
+        {"team_name": 1, "event_id": 1, "leader_id": 1, "members": 1, "remark": 1, "registered_on": 1}
+    )
 
     if not teams:
-        return {"success": True, "year": year, "count": 0, "data": []}
+        return {"success": True, "year": year, "count": 0, "data": [], "next": None}
 
     event_ids = list({team["event_id"] for team in teams})
     leader_ids = list({team["leader_id"] for team in teams})
@@ -130,7 +136,8 @@ def get_all_teams_of_year(
         "success": True,
         "year": year,
         "count": len(result),
-        "data": result
+        "data": result,
+        "next": page.next
     }
 
 
@@ -2,7 +2,9 @@ from fastapi import APIRouter, Depends, HTTPException
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from verify.token import verify_access_token
 from verify.sudo import verify_sudo_payload
-from utils.pattern import verify_session_db, DB_PATTERN
+from utils.pattern import verify_session_db, session_catalog
+from utils.snapshots import session_snapshots
+from utils.paging import Page, page_params, has_field
 from bson import ObjectId
 from database import client
 
@@ -10,72 +12,107 @@ from database import client
 security = HTTPBearer()
 router = APIRouter(prefix="/root/getUser", tags=["GetUser"])
 
+USER_SORT_FIELDS = {"name": "name", "email": "email", "college": "college_or_university"}
+
+
+
+def count_by_user(registration_collection, user_ids: list | None = None) -> dict:
+    # Per user: events registered for, how many with a team, how many remarked
+    match = [{"$match": {"user_id": {"$in": user_ids}}}] if user_ids is not None else []
+    return {
+        row["_id"]: row
+        for row in registration_collection.aggregate([
+            *match,
+            {"$group": {
+                "_id": "$user_id",
+                "events": {"$sum": 1},
+                "teams": {"$sum": {
+                    "$cond": [{"$ifNull": ["$team_id", False]}, 1, 0]
+                }},
+                "remarks": {"$sum": {
+                    "$cond": [{"$ifNull": ["$remark", False]}, 1, 0]
+                }}
+            }}
+        ])
+    }
+
+
+
+
+@session_snapshots.view("all_users")
+def session_users_summary(db) -> dict:
+    users_cursor = db["user"].find(
+        {},
+        {
+            "name": 1,
+            "email": 1
+        }
+    )
+    user_counts = count_by_user(db["registration"])
+
+    users = []
+    for user in users_cursor:
+        counts = user_counts.get(user["_id"], {})
+        no_of_events = counts.get("events", 0)
+        no_of_teams = counts.get("teams", 0)
+        no_of_remarks = counts.get("remarks", 0)
+
+        users.append({
+            "user_id": str(user["_id"]),
+            "name": user.get("name"),
+            "email": user.get("email"),
+            "no_of_events": no_of_events,
+            "no_of_teams": no_of_teams,
+            "no_of_remarks": no_of_remarks
+        })
+
+    return {
+        "count": len(users),
+        "data": users
+    }
+
 
 
 
 @router.get("/all-users")
 def get_all_users_all_sessions(
+    allow_partial: bool = False,
     credentials: HTTPAuthorizationCredentials = Depends(security)
 ):
     token = credentials.credentials
     payload = verify_access_token(token)
     verify_sudo_payload(payload)
 
-    result = {}
+    return session_snapshots.response("all_users", session_catalog.session_dbs(), allow_partial)
 
-    db_names = client.list_database_names()
 
-    for db_name in db_names:
-        if not DB_PATTERN.match(db_name):
-            continue
+def registered_user_filter(registration_collection, event_id: str | None, has_team: bool | None, has_remark: bool | None) -> dict:
+    # Users are matched through their registrations, each condition
+    # narrows the set of user ids
+    query = {}
+    if event_id is not None:
+        if not ObjectId.is_valid(event_id):
+            raise HTTPException(status_code=400, detail="Invalid event_id")
+        ids = registration_collection.distinct("user_id", {"event_id": ObjectId(event_id)})
+        query.setdefault("$and", []).append({"_id": {"$in": ids}})
 
-        try:
-            session_db_name = verify_session_db(db_name)
-        except Exception:
+    for field, present in (("team_id", has_team), ("remark", has_remark)):
+        if present is None:
             continue
+        ids = registration_collection.distinct("user_id", has_field(field, True))
+        query.setdefault("$and", []).append({"_id": {"$in" if present else "$nin": ids}})
 
-        db = client[session_db_name]
-        user_collection = db["user"]
-
-        users_cursor = user_collection.find(
-            {},
-            {
-                "name": 1,
-                "email": 1,
-                "registered_event": 1
-            }
-        )
-
-        users = []
-        for user in users_cursor:
-            registered_events = user.get("registered_event", [])
-            no_of_events = len(registered_events)
-            no_of_teams = sum(1 for e in registered_events if e.get("team_id") is not None)
-            no_of_remarks = sum(1 for e in registered_events if "remark" in e)
-
-            users.append({
-                "user_id": str(user["_id"]),
-                "name": user.get("name"),
-                "email": user.get("email"),
-                "no_of_events": no_of_events,
-                "no_of_teams": no_of_teams,
-                "no_of_remarks": no_of_remarks
-            })
-
-        result[session_db_name] = {
-            "count": len(users),
-            "data": users
-        }
-
-    return {
-        "success": True,
-        "data": result
-    }
+    return query
 
 
 @router.get("/{year}")
 def get_all_users_of_year(
     year: str,
+    college: str | None = None,
+    event_id: str | None = None,
+    has_team: bool | None = None,
+    has_remark: bool | None = None,
+    page: Page = Depends(page_params(USER_SORT_FIELDS)),
     credentials: HTTPAuthorizationCredentials = Depends(security)
 ):
     token = credentials.credentials
@@ -86,29 +123,31 @@ def get_all_users_of_year(
     db = client[year]
     user_collection = db["user"]
 
-    users_cursor = user_collection.find(
-        {},
+    query = registered_user_filter(db["registration"], event_id, has_team, has_remark)
+    if college is not None:
+        query["college_or_university"] = college
+
+    page_users = page.find(
+        user_collection,
+        query,
         {
             "name": 1,
             "email": 1,
-            "registered_event": 1
+            "college_or_university": 1
         }
     )
+    user_counts = count_by_user(db["registration"], [user["_id"] for user in page_users])
 
     users = []
 
-    for user in users_cursor:
-        registered_events = user.get("registered_event", [])
+    for user in page_users:
+        counts = user_counts.get(user["_id"], {})
 
-        no_of_events = len(registered_events)
+        no_of_events = counts.get("events", 0)
 
-        no_of_teams = sum(
-            1 for e in registered_events if e.get("team_id") is not None
-        )
+        no_of_teams = counts.get("teams", 0)
 
-        no_of_remarks = sum(
-            1 for e in registered_events if "remark" in e
-        )
+        no_of_remarks = counts.get("remarks", 0)
 
         users.append({
             "user_id": str(user["_id"]),
@@ -123,7 +162,8 @@ def get_all_users_of_year(
         "success": True,
         "year": year,
         "count": len(users),
-        "data": users
+        "data": users,
+        "next": page.next
     }
 
 
@@ -145,6 +185,7 @@ def get_user_details(
     user_collection = db["user"]
     event_collection = db["event"]
     team_collection = db["team"]
+    registration_collection = db["registration"]
 
     if not ObjectId.is_valid(user_id):
         raise HTTPException(status_code=400, detail="Invalid user_id")
@@ -154,8 +195,10 @@ def get_user_details(
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
-    event_ids = [reg["event_id"] for reg in user.get("registered_event", []) if reg.get("event_id")]
-    team_ids = [reg["team_id"] for reg in user.get("registered_event", []) if reg.get("team_id")]
+    registrations = list(registration_collection.find({"user_id": user_oid}))
+
+    event_ids = [reg["event_id"] for reg in registrations if reg.get("event_id")]
+    team_ids = [reg["team_id"] for reg in registrations if reg.get("team_id")]
 
     events = event_collection.find({"_id": {"$in": event_ids}}, {"_id": 1, "event_name": 1})
     teams = team_collection.find({"_id": {"$in": team_ids}}, {"_id": 1, "team_name": 1, "leader_id": 1, "members": 1})
@@ -164,7 +207,7 @@ def get_user_details(
     team_map = {t["_id"]: t for t in teams}
 
     enriched_registered_events = []
-    for reg in user.get("registered_event", []):
+    for reg in registrations:
         event_id = reg.get("event_id")
         team_id = reg.get("team_id")
         remark = reg.get("remark")
@@ -1,18 +1,30 @@
-from fastapi import APIRouter, HTTPException, status, Depends
+from fastapi import APIRouter, HTTPException, status, Depends, Response
 from datetime import datetime
 from database import current_admin_collection, client
 from schemas.admin import AdminCreate
 from utils.time import IST
-from verify.token import verify_access_token
+from verify.token import verify_access_token, token_cache
 from verify.superadmin import verify_superadmin_payload
 from verify.admin import verify_admin, verify_admin_by_email
+from verify.principal import invalidate_principal, principal_cache
+from verify.event_cache import event_cache
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from utils.pattern import verify_admin_collection, DB_PATTERN
+from utils.pattern import verify_admin_collection, verify_session_db, session_catalog
+from utils.google_certs import google_certs
+from utils.indexes import index_report
+from utils.write_buffer import registration_buffer
+from utils.transfer import transfer_stats
+from utils.snapshots import session_snapshots
+from utils.fanout import session_fanout, check_partial
+from utils.paging import Page, page_params
+from utils.images import thumbnail_cache, image_disk_cache
 
 security = HTTPBearer()
 
 router = APIRouter(prefix="/super", tags=["Super"])
 
+ADMIN_SORT_FIELDS = {"email": "email", "name": "name"}
+
 
 @router.post("/register-admin")
 def create_admin(
@@ -31,7 +43,7 @@ def create_admin(
     admin_data["email"] = admin.email.lower()
 
 
-    verify_admin_by_email(admin_data["email"], "N")
+    verify_admin_by_email(admin_data["email"], "N", ["_id"])
 
     admin_collection = current_admin_collection()
     admin_collection.insert_one(admin_data)
@@ -45,44 +57,140 @@ def create_admin(
 
 
 
+def session_admins(coll_name: str) -> list:
+    admins = list(client["credentials"][coll_name].find())
+
+    for admin in admins:
+        admin["_id"] = str(admin["_id"])
+        if "created_by" in admin and "super_id" in admin["created_by"]:
+            admin["created_by"]["super_id"] = str(
+                admin["created_by"]["super_id"]
+            )
+
+    return admins
+
+
 @router.get("/all-admins")
 def get_all_admins_all_sessions(
+    response: Response,
+    allow_partial: bool = False,
     credentials: HTTPAuthorizationCredentials = Depends(security)
 ):
     token = credentials.credentials
     payload = verify_access_token(token)
     verify_superadmin_payload(payload)
 
-    result = {}
-    db = client["credentials"]
-    coll_names = db.list_collection_names()
+    fanned = session_fanout.run(session_admins, session_catalog.admin_collections())
+    check_partial(fanned, allow_partial)
+    response.headers.update(fanned.headers())
 
-    for coll_name in coll_names:
+    # admin_YYYY_YYYY -> YYYY_YYYY
+    result = {coll_name[6:]: admins for coll_name, admins in fanned.results.items()}
 
-        if not coll_name.startswith("admin_"):
-            continue
+    data = {
+        "success": True,
+        "data": result
+    }
+    if fanned.partial:
+        data["partial"] = True
+        data["failed_sessions"] = [coll_name[6:] for coll_name in fanned.failed]
+    return data
 
-        session = coll_name[6:]
 
-        if not DB_PATTERN.match(session):
-            continue
 
-        admin_collection = db[coll_name]
 
-        admins = list(admin_collection.find())
 
-        for admin in admins:
-            admin["_id"] = str(admin["_id"])
-            if "created_by" in admin and "super_id" in admin["created_by"]:
-                admin["created_by"]["super_id"] = str(
-                    admin["created_by"]["super_id"]
-                )
 
-        result[session] = admins
+@router.get("/cache-stats")
+def get_cache_stats(
+    credentials: HTTPAuthorizationCredentials = Depends(security)
+):
+    token = credentials.credentials
+    payload = verify_access_token(token)
+    verify_superadmin_payload(payload)
 
     return {
         "success": True,
-        "data": result
+        "data": {
+            "google_certs": google_certs.stats(),
+            "access_tokens": token_cache.stats(),
+            "principals": principal_cache.stats(),
+            "events": event_cache.stats(),
+            "registration_buffer": registration_buffer.stats(),
+            "snapshots": session_snapshots.stats(),
+            "fanout": session_fanout.stats(),
+            "thumbnails": thumbnail_cache.stats(),
+            "image_disk_cache": image_disk_cache.stats() if image_disk_cache else None
+        }
+    }
+
+
+
+
+
+
+@router.get("/db-transfer")
+def get_db_transfer(
+    reset: bool = False,
+    credentials: HTTPAuthorizationCredentials = Depends(security)
+):
+    token = credentials.credentials
+    payload = verify_access_token(token)
+    verify_superadmin_payload(payload)
+
+    data = transfer_stats.stats()
+    if reset:
+        transfer_stats.clear()
+
+    return {
+        "success": True,
+        "data": data
+    }
+
+
+
+
+
+@router.get("/indexes/{db_name}")
+def get_index_report(
+    db_name: str,
+    credentials: HTTPAuthorizationCredentials = Depends(security)
+):
+    token = credentials.credentials
+    payload = verify_access_token(token)
+    verify_superadmin_payload(payload)
+
+    db_name = verify_session_db(db_name)
+
+    return {
+        "success": True,
+        "data": index_report(client[db_name])
+    }
+
+
+
+
+
+
+@router.post("/snapshots/{db_name}")
+def rebuild_snapshots(
+    db_name: str,
+    credentials: HTTPAuthorizationCredentials = Depends(security)
+):
+    token = credentials.credentials
+    payload = verify_access_token(token)
+    verify_superadmin_payload(payload)
+
+    db_name = verify_session_db(db_name)
+    if not session_snapshots.is_closed(db_name):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Only closed Academic Sessions are snapshotted"
+        )
+
+    return {
+        "success": True,
+        "data": session_snapshots.build_closed([db_name], rebuild=True)[db_name]
     }
 
 
@@ -93,6 +201,7 @@ def get_all_admins_all_sessions(
 @router.get("/{db_name}/admins")
 def get_all_admins(
     db_name: str,
+    page: Page = Depends(page_params(ADMIN_SORT_FIELDS)),
     credentials: HTTPAuthorizationCredentials = Depends(security)
 ):
     token = credentials.credentials
@@ -103,7 +212,7 @@ def get_all_admins(
     db = client["credentials"]
     admin_collection = db[coll_name]
 
-    admins = list(admin_collection.find())
+    admins = page.find(admin_collection, {})
 
     for admin in admins:
         admin["_id"] = str(admin["_id"])
@@ -112,7 +221,8 @@ def get_all_admins(
 
     return {
         "success": True,
-        "data": admins
+        "data": admins,
+        "next": page.next
     }
 
 
@@ -135,7 +245,7 @@ def delete_admin(
 
     verify_superadmin_payload(payload)
 
-    admin, admin_obj_id, admin_email = verify_admin(admin_id, email, "Y")
+    admin, admin_obj_id, admin_email = verify_admin(admin_id, email, "Y", ["_id"])
 
     admin_collection = current_admin_collection()
     result = admin_collection.delete_one({
@@ -143,6 +253,8 @@ def delete_admin(
         "email": admin_email
     })
 
+    invalidate_principal("admin", admin_obj_id)
+
     if result.deleted_count == 0:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -1,16 +1,20 @@
 from fastapi import APIRouter, Depends
 from datetime import datetime
-from database import current_team_collection, current_user_collection, current_event_collection
+from database import current_team_collection, current_registration_collection
 from utils.time import IST
 from verify.token import verify_access_token
 from verify.user import verify_user_payload
-from verify.event import verify_event, verify_eventRegistry
+from verify.event import verify_event
+from verify.registration import verify_registration
 from verify.team import  verify_teamName , verify_teamMember, verify_teamLeader, verify_user_not_in_team, verify_is_team_allowed, verify_team_size
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from bson import ObjectId
 
 security = HTTPBearer()
 
+# Event fields read by verify_is_team_allowed and the team size checks
+TEAM_EVENT_FIELDS = ["event_team_allowed", "event_status", "event_team_size"]
+
 router = APIRouter(prefix="/team", tags=["Teams"])
 
 
@@ -22,13 +26,13 @@ def set_user_team(
     team_id: ObjectId | None
 ):
     if team_id is None:
-        update = {"$unset": {"registered_event.$.team_id": ""}}
+        update = {"$unset": {"team_id": ""}}
     else:
-        update = {"$set": {"registered_event.$.team_id": team_id}}
+        update = {"$set": {"team_id": team_id}}
 
-    user_collection = current_user_collection()
-    user_collection.update_one(
-        {"_id": user_id, "registered_event.event_id": event_id},
+    registration_collection = current_registration_collection()
+    registration_collection.update_one(
+        {"event_id": event_id, "user_id": user_id},
         update
     )
 
@@ -53,11 +57,11 @@ def signup_team(
     team_name = team_data.team_name
     members = team_data.members
 
-    event, event_id = verify_event(event_id)
+    event, event_id = verify_event(event_id, TEAM_EVENT_FIELDS)
     verify_is_team_allowed(event)
-    verify_eventRegistry(event_id, user_id, "Y", user, event)
+    registration = verify_registration(event_id, user_id, "Y")
 
-    verify_user_not_in_team(user, event_id)
+    verify_user_not_in_team(registration)
     team_, team_name = verify_teamName(team_name, event_id, "N")
 
     # Generate Unique Team Code
@@ -107,12 +111,7 @@ def signup_team(
     team_id = team.inserted_id
 
 
-    event_collection = current_event_collection()
     set_user_team(user_id, event_id, team_id)
-    event_collection.update_one(
-        {"_id": event_id},
-        {"$push": {"registered_team":team_id}}
-    )
 
 
 
@@ -141,10 +140,10 @@ def register_event(
     token = credentials.credentials
     payload = verify_access_token(token)
     user, user_id , email = verify_user_payload(payload)
-    event, event_id = verify_event(event_id)
+    event, event_id = verify_event(event_id, TEAM_EVENT_FIELDS)
     verify_is_team_allowed(event)
-    verify_eventRegistry(event_id, user_id, "Y", user, event)
-    verify_user_not_in_team(user, event_id)
+    registration = verify_registration(event_id, user_id, "Y")
+    verify_user_not_in_team(registration)
 
     team, team_code_verified = verify_teamCode(team_code, event_id)
     verify_team_size(event,team)
@@ -184,28 +183,24 @@ def delete_team(
     token = credentials.credentials
     payload = verify_access_token(token)
     leader, leader_id, email = verify_user_payload(payload)
-    event, event_id = verify_event(event_id)
+    event, event_id = verify_event(event_id, TEAM_EVENT_FIELDS)
     verify_is_team_allowed(event)
-    verify_eventRegistry(event_id, leader_id, "Y", leader, event)
+    verify_registration(event_id, leader_id, "Y")
 
     team,team_name = verify_teamName(team_name, event_id, "Y")
     verify_teamLeader(team, leader_id, "Y")
     team_id = team["_id"]
 
 
-    set_user_team(leader_id, event_id, None)
-    for member_id in team["members"]:
-        set_user_team(member_id, event_id, None)
+    registration_collection = current_registration_collection()
+    registration_collection.update_many(
+        {"event_id": event_id, "team_id": team_id},
+        {"$unset": {"team_id": ""}}
+    )
 
     team_collection = current_team_collection()
     team_collection.delete_one({"_id": team_id})
 
-    event_collection = current_event_collection()
-    event_collection.update_one(
-        {"_id": event_id},
-        {"$pull": {"registered_team":team_id}}
-    )
-
     return {"message": "Team deleted successfully"}
 
 
@@ -218,9 +213,9 @@ def leave_team(
     token = credentials.credentials
     payload = verify_access_token(token)
     user, user_id, _ = verify_user_payload(payload)
-    event, event_id = verify_event(event_id)
+    event, event_id = verify_event(event_id, TEAM_EVENT_FIELDS)
     verify_is_team_allowed(event)
-    verify_eventRegistry(event_id, user_id, "Y", user, event)
+    verify_registration(event_id, user_id, "Y")
 
 
     team, team_name = verify_teamName(team_name, event_id, "Y")
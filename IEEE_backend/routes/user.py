@@ -1,42 +1,62 @@
-from fastapi import APIRouter, HTTPException, Depends
-from fastapi.responses import StreamingResponse
+import asyncio
+from fastapi import APIRouter, HTTPException, Depends, Request
+from fastapi.responses import Response
 from datetime import datetime
-from database import client,current_fs_collection, current_user_collection, current_event_collection, current_team_collection
+from pymongo.errors import DuplicateKeyError
+from database import client,current_session,current_fs_collection, current_user_collection, session_fs, current_async_user_collection, current_async_event_collection, current_async_team_collection, current_async_registration_collection, current_async_seats_collection
 from schemas.user import UserCreate
+from schemas.event import EventCreate, ImageBatch
 from utils.time import IST
+from utils.etag import etag_matches, not_modified
+from utils.images import image_response, check_image_size, load_images, pack_images
+from utils.signed_urls import url_window, sign_image_url, verify_image_signature
+from utils.reader import REGISTRATION_BUFFER
+from utils.write_buffer import registration_buffer
 from verify.token import verify_access_token
-from verify.user import verify_user_payload
-from verify.event import verify_event, verify_eventRegistry, verify_can_register
+from verify.user import verify_user_payload, verify_user_payload_async
+from verify.principal import invalidate_principal
+from verify.event_cache import event_cache
+from verify.event import verify_event_async, parse_event_id, registration_open_filter, explain_registration_failure
+from verify.registration import verify_registration_async, check_registration
 from verify.team import verify_team_by_id, verify_in_team
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from utils.pattern import DB_PATTERN, verify_session_db
+from utils.pattern import verify_session_db, session_catalog
+from utils.snapshots import session_snapshots
+from utils.paging import Page, page_params
+from utils.seats import allocate_seat, release_seat, shard_count
 from bson import ObjectId
-from gridfs import GridFS
 
 
 security = HTTPBearer()
 
 router = APIRouter(prefix="/users", tags=["Users"])
 
+# What /users/event shows: the admin-editable fields, not remarks or audit data
+EVENT_DETAIL_FIELDS = list(EventCreate.model_fields) + ["event_thumbnail_id"]
+TEAM_DETAIL_FIELDS = ["event_id", "leader_id", "members", "team_code", "team_name", "registered_on"]
+# The catalog is per user only in that it needs a login, and must be
+# revalidated on every poll so event edits show up straight away
+CATALOG_CACHE_HEADERS = {"Cache-Control": "private, no-cache"}
+CATALOG_SORT_FIELDS = {"date": "event_date", "name": "event_name", "deadline": "last_date_to_register"}
+
 
 
 
 @router.patch("/register")
-def signup_user(
+async def signup_user(
     user_data: UserCreate,
     credentials: HTTPAuthorizationCredentials = Depends(security)
     ):
 
     token = credentials.credentials
     payload = verify_access_token(token)
-    user,user_id ,email = verify_user_payload(payload)
+    user,user_id ,email = await verify_user_payload_async(payload)
     if len(user)>4:
         raise HTTPException(status_code=404, detail="User Already Registered")
 
     
     
     update_data = user_data.model_dump(mode="json")
-    update_data["registered_event"] = []
 
     if email != update_data["email"].lower():
         raise HTTPException(status_code=404, detail="Email Mismatch found")
@@ -47,11 +67,12 @@ def signup_user(
     if not update_data.get("linkedin_profile"):
         update_data.pop("linkedin_profile", None)
 
-    user_collection = current_user_collection()
-    user_collection.update_one(
+    user_collection = current_async_user_collection()
+    await user_collection.update_one(
         {"_id": user_id},
         {"$set": update_data}
     )
+    invalidate_principal("user", user_id)
 
     return {"message": "User registered successfully"}
 
@@ -66,14 +87,14 @@ def signup_user(
 
 
 @router.patch("/change-details")
-def signup_user(
+async def signup_user(
     user_data: UserCreate,
     credentials: HTTPAuthorizationCredentials = Depends(security)
     ):
 
     token = credentials.credentials
     payload = verify_access_token(token)
-    user,user_id ,email = verify_user_payload(payload)
+    user,user_id ,email = await verify_user_payload_async(payload)
     
     
     update_data = user_data.model_dump(mode="json")
@@ -81,44 +102,91 @@ def signup_user(
     if email != update_data["email"].lower():
         raise HTTPException(status_code=404, detail="Email Mismatch found")
 
-    user_collection = current_user_collection()
-    user_collection.update_one(
+    user_collection = current_async_user_collection()
+    await user_collection.update_one(
         {"_id": user_id},
         {"$set": update_data}
     )
+    invalidate_principal("user", user_id)
 
     return {"message": "User details changed successfully"}
 
 
 
 
+async def insert_registration(registration: dict):
+    registration_collection = current_async_registration_collection()
+    if REGISTRATION_BUFFER:
+        # Returns once the batch holding this registration is written
+        await registration_buffer.submit(registration_collection, registration)
+    else:
+        await registration_collection.insert_one(registration)
+
+
+
+async def push_registration(
+    user_id: ObjectId,
+    event_id: ObjectId,
+    timestamp: str
+) -> bool:
+    event_collection = current_async_event_collection()
+    seats_collection = current_async_seats_collection()
+
+    # The deadline lives in the event filter, and the unique
+    # (event_id, user_id) index rejects a second registration
+    event = await event_collection.find_one(
+        {"_id": event_id, **registration_open_filter()},
+        {"_id": 1, "event_capacity": 1}
+    )
+    if not event:
+        return False
+
+    registration = {
+        "event_id": event_id,
+        "user_id": user_id,
+        "registered_on": timestamp
+    }
+
+    capacity = event.get("event_capacity")
+    if capacity is not None:
+        shard = await allocate_seat(seats_collection, event_id, shard_count(capacity))
+        if shard is None:
+            return False
+        registration["seat_shard"] = shard
+
+    try:
+        await insert_registration(registration)
+    except Exception as error:
+        # No registration was written, whatever went wrong (a duplicate,
+        # a full write buffer, a failed write), so the seat goes back.
+        # A cancelled request is left alone: its buffered insert may
+        # still land.
+        if capacity is not None:
+            await release_seat(seats_collection, event_id, registration["seat_shard"])
+        if isinstance(error, DuplicateKeyError):
+            return False
+        raise
+
+    return True
+
+
+
 @router.patch("/register-event")
-def register_event(
+async def register_event(
     event_id: str,
     credentials: HTTPAuthorizationCredentials = Depends(security)
     ):
     token = credentials.credentials
     payload = verify_access_token(token)
-    user,user_id , email = verify_user_payload(payload)
-    event,event_id = verify_event(event_id)
+    user,user_id , email = await verify_user_payload_async(payload)
+    event_id = parse_event_id(event_id)
 
     timestamp = datetime.now(IST).isoformat()
 
+    registered = await push_registration(user_id, event_id, timestamp)
 
-    verify_eventRegistry(event_id, user_id, "N", user, event)
-    verify_can_register(event)
-        
-    user_collection = current_user_collection()
-    user_collection.update_one(
-        {"_id": user_id},
-        {"$push": {"registered_event": {"event_id": event_id,"registered_on": timestamp}}}
-    )
-        
-    event_collection = current_event_collection()
-    event_collection.update_one(
-        {"_id": event_id},
-        {"$push": {"registered_user": user_id}}
-    )
+    if not registered:
+        await explain_registration_failure(event_id, user_id)
 
 
     return {"message": "Event registered successfully"}
@@ -128,28 +196,27 @@ def register_event(
 
 
 @router.delete("/unregister-event")
-def unregister_event(
+async def unregister_event(
     event_id: str,
     credentials: HTTPAuthorizationCredentials = Depends(security)
 ):
     token = credentials.credentials
     payload = verify_access_token(token)
-    user, user_id, email = verify_user_payload(payload)
-    event, event_id = verify_event(event_id)
-
-    verify_eventRegistry(event_id, user_id, "Y", user, event)
+    user, user_id, email = await verify_user_payload_async(payload)
+    event_id = parse_event_id(event_id)
 
-    user_collection = current_user_collection()
-    user_collection.update_one(
-        {"_id": user_id},
-        {"$pull": {"registered_event": {"event_id": event_id}}}
+    registration_collection = current_async_registration_collection()
+    registration = await registration_collection.find_one_and_delete(
+        {"event_id": event_id, "user_id": user_id},
+        projection={"seat_shard": 1}
     )
 
-    event_collection = current_event_collection()
-    event_collection.update_one(
-        {"_id": event_id},
-        {"$pull": {"registered_user": user_id}}
-    )
+    if not registration:
+        await verify_event_async(event_id, ["_id"])
+        check_registration(None, "Y")
+
+    # No-op unless the event is capped
+    await release_seat(current_async_seats_collection(), event_id, registration.get("seat_shard"))
 
     return {"message": "Event unregistered successfully"}
 
@@ -158,10 +225,10 @@ def unregister_event(
 
 
 @router.get("/profile")
-def get_user_details(credentials: HTTPAuthorizationCredentials = Depends(security)):
+async def get_user_details(credentials: HTTPAuthorizationCredentials = Depends(security)):
     token = credentials.credentials
     payload = verify_access_token(token)
-    user,user_id ,email = verify_user_payload(payload)
+    user,user_id ,email = await verify_user_payload_async(payload)
 
     user.pop("_id", None)
     user.pop("registered_event", None)
@@ -173,129 +240,107 @@ def get_user_details(credentials: HTTPAuthorizationCredentials = Depends(securit
     }
 
 
-@router.get("/registered")
-def get_registered_events_teams(credentials: HTTPAuthorizationCredentials = Depends(security)):
-    token = credentials.credentials
-    payload = verify_access_token(token)
-    user,user_id ,email = verify_user_payload(payload)
+async def load_registered_events(user_id: ObjectId) -> list[dict]:
+    # At most three indexed round trips however large the session is:
+    # the user's registrations, their teams, then every person in them
+    registration_collection = current_async_registration_collection()
+    team_collection = current_async_team_collection()
+    user_collection = current_async_user_collection()
 
-    event_collection = current_event_collection()
-    event = event_collection.find(
-        {},
-        {"_id":1,
-         "event_name":1})
-    
-    team_collection = current_team_collection()
-    team = team_collection.find(
-        {},
-        {"_id":1,
-         "team_name":1,
-         "team_code":1,  # Add team_code to projection
-         "registered_on":1,
-         "leader_id":1,
-         "members":1})  # Add members to get member IDs
-    
-    event_map = {
-        str(e["_id"]): e["event_name"]
-        for e in event
-    }
+    registrations = await registration_collection.find({"user_id": user_id}).to_list()
 
-    user_collection = current_user_collection()
-    
-    # Build team map with member details
-    team_map = {}
-    for t in team:
-        team_id = str(t["_id"])
-        leader_id = t.get("leader_id")
-        member_ids = t.get("members", [])
-        
-        # Fetch leader details
-        leader = user_collection.find_one(
-            {"_id": leader_id},
+    team_ids = [reg["team_id"] for reg in registrations if reg.get("team_id")]
+    teams = {}
+    if team_ids:
+        teams_cursor = team_collection.find(
+            {"_id": {"$in": team_ids}},
+            {"team_name": 1, "team_code": 1, "registered_on": 1, "leader_id": 1, "members": 1}
+        )
+        teams = {t["_id"]: t async for t in teams_cursor}
+
+    people_ids = set()
+    for t in teams.values():
+        people_ids.add(t.get("leader_id"))
+        people_ids.update(t.get("members", []))
+    people_ids.discard(None)
+
+    people = {}
+    if people_ids:
+        people_cursor = user_collection.find(
+            {"_id": {"$in": list(people_ids)}},
             {"name": 1, "email": 1}
         )
-        
-        # Fetch member details
-        members_data = []
-        if member_ids:
-            members_cursor = user_collection.find(
-                {"_id": {"$in": member_ids}},
-                {"name": 1, "email": 1}
-            )
-            members_data = [
-                {
-                    "name": m.get("name"),
-                    "email": m.get("email")
-                }
-                for m in members_cursor
-            ]
-        
-        # Build complete members list (leader first, then members)
-        all_members = []
-        if leader:
-            all_members.append({
-                "name": leader.get("name"),
-                "email": leader.get("email"),
-                "role": "leader"
-            })
-        all_members.extend([{**m, "role": "member"} for m in members_data])
-        
-        team_map[team_id] = {
-            "team_name": t["team_name"],
-            "team_code": t.get("team_code"),
-            "team_created_on": t.get("registered_on"),
-            "leader_id": leader_id,
-            "members": all_members  # Include full member details
-        }
+        people = {p["_id"]: p async for p in people_cursor}
 
+    events = {e["_id"]: e for e in await event_cache.all_async()}
 
     result = []
-
-    for reg in user.get("registered_event", []):
-        event_id = str(reg["event_id"])
-        team_id = str(reg.get("team_id")) if reg.get("team_id") else None
-        if team_id:
-            if user_id == team_map.get(team_id,{}).get("leader_id"):
-                role = "leader"
-            else:
-                role = "member"
-        else:
-            role=None
-
+    for reg in registrations:
+        team = teams.get(reg.get("team_id"))
+
+        members = []
+        if team:
+            leader = people.get(team.get("leader_id"))
+            if leader:
+                members.append({
+                    "name": leader.get("name"),
+                    "email": leader.get("email"),
+                    "role": "leader"
+                })
+            for member_id in team.get("members", []):
+                member = people.get(member_id)
+                if member:
+                    members.append({
+                        "name": member.get("name"),
+                        "email": member.get("email"),
+                        "role": "member"
+                    })
+
+        role = None
+        if reg.get("team_id"):
+            role = "leader" if team and team.get("leader_id") == user_id else "member"
 
         result.append({
-            "event_id": event_id,
-            "event_name": event_map.get(event_id),
+            "event_id": str(reg["event_id"]),
+            "event_name": events.get(reg["event_id"], {}).get("event_name"),
             "registered_for_event_on": reg.get("registered_on"),
-            "team_id": team_id,
-            "team_name": team_map.get(team_id, {}).get("team_name"),
-            "team_code": team_map.get(team_id, {}).get("team_code"),  # Add team_code to response
-            "team_created_on": team_map.get(team_id, {}).get("team_created_on"),
-            "members": team_map.get(team_id, {}).get("members", []),  # Add members to response
-            "role":role
+            "team_id": str(reg["team_id"]) if reg.get("team_id") else None,
+            "team_name": team.get("team_name") if team else None,
+            "team_code": team.get("team_code") if team else None,
+            "team_created_on": team.get("registered_on") if team else None,
+            "members": members,
+            "role": role
         })
 
+    return result
+
+
+
+@router.get("/registered")
+async def get_registered_events_teams(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    token = credentials.credentials
+    payload = verify_access_token(token)
+    user,user_id ,email = await verify_user_payload_async(payload)
+
+    result = await load_registered_events(user_id)
+
     return {"registered_event": result}
 
 
     
 @router.get("/event")
-def get_registered_event(
+async def get_registered_event(
     event_id:str,
     credentials: HTTPAuthorizationCredentials = Depends(security)):
     token = credentials.credentials
     payload = verify_access_token(token)
-    user,user_id ,email = verify_user_payload(payload)
-    event,event_id = verify_event(event_id)
-    verify_eventRegistry(event_id, user_id, "Y", user, event)
+    (user,user_id ,email), (event,event_id) = await asyncio.gather(
+        verify_user_payload_async(payload),
+        verify_event_async(event_id, EVENT_DETAIL_FIELDS)
+    )
+    await verify_registration_async(event_id, user_id, "Y")
 
     event.pop("_id", None)
-    event.pop("registered_user", None)
-    event.pop("registered_team", None)
-    event.pop("remark", None)
-    event.pop("remarked_user",None)
-    event.pop("remarked_team",None)
-    event.pop("created_on", None)
     event["event_thumbnail_id"] = str(event.get("event_thumbnail_id"))
 
     return {
@@ -313,15 +358,11 @@ def get_team(
     token = credentials.credentials
     payload = verify_access_token(token)
     user,user_id, email = verify_user_payload(payload)
-    team,team_id = verify_team_by_id(team_id)
+    team,team_id = verify_team_by_id(team_id, TEAM_DETAIL_FIELDS)
     verify_in_team(team, user_id)
 
 
-    event_collection = current_event_collection()
-    event = event_collection.find_one(
-        {"_id": team["event_id"]},
-        {"event_name": 1}
-    )
+    event = event_cache.get(team["event_id"])
 
     user_collection = current_user_collection()
     leader = user_collection.find_one(
@@ -359,15 +400,50 @@ def get_team(
 
 
 @router.get("/events")
-def get_this_session_events(
+async def get_this_session_events(
+    request: Request,
+    team_allowed: bool | None = None,
+    page: Page = Depends(page_params(CATALOG_SORT_FIELDS)),
     credentials: HTTPAuthorizationCredentials = Depends(security)
 ):
     token = credentials.credentials
     payload = verify_access_token(token)
-    user,user_id, email = verify_user_payload(payload)
+    user,user_id, email = await verify_user_payload_async(payload)
+
+    paged = page.limit is not None or page.after or page.field != "_id" or page.descending
+    if paged or team_allowed is not None:
+        # Paged from the cached catalog, no query reaches Mongo
+        rows = await event_cache.catalog_rows_async()
+        if team_allowed is not None:
+            rows = [row for row in rows if bool(row.get("event_team_allowed")) == team_allowed]
+        return {
+            "success": True,
+            "data": page.slice(rows),
+            "next": page.next
+        }
+
+    # Same body for every user, rendered once per event cache version
+    body, etag = await event_cache.catalog_async()
+    if etag_matches(request, etag):
+        return not_modified(etag, CATALOG_CACHE_HEADERS)
+
+    return Response(
+        content=body,
+        media_type="application/json",
+        headers={"ETag": etag, **CATALOG_CACHE_HEADERS}
+    )
+
 
-    event_collection = current_event_collection()
-    events_cursor = event_collection.find(
+def add_thumbnail_urls(db_name: str, events: list) -> list:
+    window = url_window()
+    for event in events:
+        event["event_thumbnail_url"] = sign_image_url(db_name, event.get("event_thumbnail_id"), window)
+    return events
+
+
+@session_snapshots.view("archive", expand=add_thumbnail_urls, expand_key=url_window)
+def archive_session_events(db) -> list:
+    events_cursor = db["event"].find(
         {},
         {
             "registered_user": 0,
@@ -383,84 +459,44 @@ def get_this_session_events(
     for event in events_cursor:
         event["_id"] = str(event["_id"])
         event["event_thumbnail_id"] = str(event.get("event_thumbnail_id",None))
+
         events.append(event)
 
-    return {
-        "success": True,
-        "data": events
-    }
+    return events
 
 
 @router.get("/archive")
 def get_all_archieved_events(
+    allow_partial: bool = False,
     credentials: HTTPAuthorizationCredentials = Depends(security)
 ):
     token = credentials.credentials
     payload = verify_access_token(token)
     user,user_id, email = verify_user_payload(payload)
 
-    db_names = client.list_database_names()
-
-    archive_data={}
-    for db_name in db_names:
-        if not DB_PATTERN.match(db_name):
-            continue
-
-        db = client[db_name]
-        event_collection = db["event"]
-
-        events_cursor = event_collection.find(
-            {},
-            {
-                "registered_user": 0,
-                "registered_team": 0,
-                "remark": 0,
-                "remarked_user":0,
-                "remarked_team":0,
-                "created_on":0
-            }
-        )
-
-        events = []
-        for event in events_cursor:
-            event["_id"] = str(event["_id"])
-            event["event_thumbnail_id"] = str(event.get("event_thumbnail_id",None))
-
-            events.append(event)
-
-        archive_data[db_name] = events
-
-    return {
-        "success": True,
-        "data": archive_data
-    }
+    return session_snapshots.response("archive", session_catalog.session_dbs(), allow_partial)
 
 
 @router.get("/image/{image_id}")
 def get_image_current_year(
+    request: Request,
     image_id: str,
+    size: str | None = None,
     credentials: HTTPAuthorizationCredentials = Depends(security)
 ):
     token = credentials.credentials
     payload = verify_access_token(token)
     user, user_id, email = verify_user_payload(payload)
 
-    fs = current_fs_collection()
-    try:
-        grid_out = fs.get(ObjectId(image_id))
-    except Exception:
-        raise HTTPException(status_code=404, detail="Image not found")
-
-    return StreamingResponse(
-        grid_out,
-        media_type=grid_out.content_type or "image/jpeg"
-    )
+    return image_response(request, current_session(), current_fs_collection(), image_id, size)
 
 
 @router.get("/image/{year}/{image_id}")
 def get_image_from_archive(
+    request: Request,
     year: str,
     image_id: str,
+    size: str | None = None,
     credentials: HTTPAuthorizationCredentials = Depends(security)
 ):
     token = credentials.credentials
@@ -469,16 +505,58 @@ def get_image_from_archive(
 
     year = verify_session_db(year)
 
-    archive_db = client[year]
-    fs = GridFS(archive_db)
+    return image_response(request, year, session_fs(year), image_id, size)
 
-    try:
-        grid_out = fs.get(ObjectId(image_id))
-    except Exception:
-        raise HTTPException(status_code=404, detail="Image not found")
 
-    return StreamingResponse(
-        grid_out,
-        media_type=grid_out.content_type or "image/jpeg"
+@router.post("/images")
+def get_image_batch(
+    batch: ImageBatch,
+    credentials: HTTPAuthorizationCredentials = Depends(security)
+):
+    token = credentials.credentials
+    payload = verify_access_token(token)
+    user, user_id, email = verify_user_payload(payload)
+
+    check_image_size(batch.size)
+    current = current_session()
+    by_session: dict[str, list[ObjectId]] = {}
+    refs = []
+    for ref in batch.images:
+        year = verify_session_db(ref.year) if ref.year else current
+        # A malformed id is just not found, like a deleted one
+        image_oid = ObjectId(ref.image_id) if ObjectId.is_valid(ref.image_id) else None
+        if image_oid is not None:
+            by_session.setdefault(year, []).append(image_oid)
+        refs.append((year, ref.image_id, image_oid))
+
+    loaded = {
+        year: load_images(year, client[year], image_oids, batch.size)
+        for year, image_oids in by_session.items()
+    }
+
+    entries = [{"image_id": image_id, "year": year} for year, image_id, _ in refs]
+    images = [
+        loaded[year].get(image_oid) if image_oid is not None else None
+        for year, _, image_oid in refs
+    ]
+
+    return Response(
+        content=pack_images(entries, images),
+        media_type="application/octet-stream"
     )
 
+
+@router.get("/signed-image/{year}/{image_id}")
+def get_signed_image(
+    request: Request,
+    year: str,
+    image_id: str,
+    exp: int,
+    sig: str,
+    size: str | None = None
+):
+    # The URL was handed out by an authenticated listing, so the
+    # signature stands in for the bearer token
+    verify_image_signature(year, image_id, exp, sig)
+
+    return image_response(request, year, session_fs(year), image_id, size)
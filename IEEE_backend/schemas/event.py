@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Literal, Optional
 from datetime import date,time
 from fastapi import Form
@@ -60,3 +60,13 @@ class EventCreate(BaseModel):
             event_status=event_status,
             event_prizes=event_prizes,
         )
+
+
+class ImageRef(BaseModel):
+    image_id: str
+    year: Optional[str] = None  # None is the current session
+
+
+class ImageBatch(BaseModel):
+    images: list[ImageRef] = Field(min_length=1, max_length=100)
+    size: Optional[str] = None  # a resized variant, e.g. "card"
@@ -0,0 +1,175 @@
+import hashlib
+import os
+import tempfile
+from collections import OrderedDict
+from threading import Lock
+from typing import BinaryIO
+
+CHUNK_SIZE = 64 * 1024
+
+
+class DiskCache:
+    # Content-addressed file cache under root:
+    #   objects/<sha256[:2]>/<sha256>   the bytes, shared by equal files
+    #   ids/<namespace>/<key>           "<sha256>\n<content type>"
+    # Every file is written to a temp file and renamed into place, so
+    # readers never see a partial one. Objects are evicted least recently
+    # used first once their total size passes max_bytes. Hits are handed
+    # out as open files, which stay readable if the object is evicted
+    # while they are being sent. Each process
+    # tracks only what it has read or written, so workers sharing root
+    # can together hold up to max_bytes each.
+
+    def __init__(self, root: str, max_bytes: int):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._lock = Lock()
+        self._objects: OrderedDict[str, int] = OrderedDict()
+        self.resident_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+        os.makedirs(os.path.join(root, "objects"), exist_ok=True)
+        os.makedirs(os.path.join(root, "ids"), exist_ok=True)
+        self._scan()
+
+
+    def _scan(self):
+        # Objects left by an earlier run, oldest access first
+        found = []
+        for dirpath, _, filenames in os.walk(os.path.join(self.root, "objects")):
+            for name in filenames:
+                path = os.path.join(dirpath, name)
+                if name.startswith(".tmp"):
+                    os.unlink(path)
+                    continue
+                stat = os.stat(path)
+                found.append((stat.st_atime, name, stat.st_size))
+
+        for _, digest, size in sorted(found):
+            self._objects[digest] = size
+            self.resident_bytes += size
+        self._evict()
+
+
+    def object_path(self, digest: str) -> str:
+        return os.path.join(self.root, "objects", digest[:2], digest)
+
+
+    def _id_path(self, namespace: str, key: str) -> str:
+        return os.path.join(self.root, "ids", namespace, key)
+
+
+    def _write_temp(self, directory: str, chunks) -> tuple[str, str, int]:
+        # (temp path, sha256, size), the caller renames it into place
+        os.makedirs(directory, exist_ok=True)
+        digest = hashlib.sha256()
+        size = 0
+        fd, tmp = tempfile.mkstemp(prefix=".tmp", dir=directory)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                for chunk in chunks:
+                    digest.update(chunk)
+                    size += len(chunk)
+                    f.write(chunk)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+        return tmp, digest.hexdigest(), size
+
+
+    def get(self, namespace: str, key: str) -> tuple[BinaryIO, str, int] | None:
+        # (open object file, content type, size), or None on a miss. The
+        # caller closes the file.
+        try:
+            with open(self._id_path(namespace, key)) as f:
+                digest, content_type = f.read().split("\n", 1)
+        except (FileNotFoundError, ValueError):
+            self.misses += 1
+            return None
+
+        path = self.object_path(digest)
+        with self._lock:
+            try:
+                f = open(path, "rb")
+            except FileNotFoundError:
+                # Evicted since the id was written, maybe by another worker
+                size = self._objects.pop(digest, None)
+                if size is not None:
+                    self.resident_bytes -= size
+                self.misses += 1
+                return None
+            size = os.fstat(f.fileno()).st_size
+            if digest not in self._objects:
+                # Written by another worker sharing the directory
+                self._objects[digest] = size
+                self.resident_bytes += size
+                self._evict()
+            self._objects.move_to_end(digest)
+            self.hits += 1
+        return f, content_type, size
+
+
+    def put(self, namespace: str, key: str, stream, content_type: str) -> tuple[BinaryIO, int]:
+        # Copies stream into the cache chunk by chunk, returns the object
+        # opened for reading and its size. The caller closes the file.
+        tmp, digest, size = self._write_temp(
+            os.path.join(self.root, "objects"),
+            iter(lambda: stream.read(CHUNK_SIZE), b"")
+        )
+        path = self.object_path(digest)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Opened before the rename, so an eviction right after it cannot
+        # take the file away from this caller
+        f = open(tmp, "rb")
+        try:
+            os.replace(tmp, path)
+            id_path = self._id_path(namespace, key)
+            tmp, _, _ = self._write_temp(os.path.dirname(id_path), [f"{digest}\n{content_type}".encode()])
+            os.replace(tmp, id_path)
+        except BaseException:
+            f.close()
+            raise
+
+        with self._lock:
+            if digest not in self._objects:
+                self.resident_bytes += size
+            self._objects[digest] = size
+            self._objects.move_to_end(digest)
+            self.writes += 1
+            self._evict()
+        return f, size
+
+
+    def _evict(self):
+        while self.resident_bytes > self.max_bytes and len(self._objects) > 1:
+            digest, size = self._objects.popitem(last=False)
+            self.resident_bytes -= size
+            self.evictions += 1
+            try:
+                os.unlink(self.object_path(digest))
+            except FileNotFoundError:
+                pass
+
+
+    def forget(self, namespace: str, key: str) -> None:
+        # The object stays until evicted, another id may share it
+        try:
+            os.unlink(self._id_path(namespace, key))
+        except FileNotFoundError:
+            pass
+
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "objects": len(self._objects),
+            "resident_bytes": self.resident_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "writes": self.writes,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+        }
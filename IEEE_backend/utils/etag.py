@@ -0,0 +1,22 @@
+import hashlib
+from fastapi import Request
+from fastapi.responses import Response
+
+
+def make_etag(body: bytes) -> str:
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    # If-None-Match may list several tags, weak ones included
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    tags = [tag.strip().removeprefix("W/") for tag in header.split(",")]
+    return etag in tags
+
+
+def not_modified(etag: str, headers: dict | None = None) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, **(headers or {})})
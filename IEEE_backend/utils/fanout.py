@@ -0,0 +1,137 @@
+import contextvars
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from threading import Lock
+from typing import Callable, Hashable
+import pymongo
+from pymongo.errors import PyMongoError
+from fastapi import HTTPException, status
+
+logger = logging.getLogger(__name__)
+
+MAX_WORKERS = 8
+SESSION_TIMEOUT = 10.0
+# Time a session may spend queued for a worker on top of SESSION_TIMEOUT
+QUEUE_GRACE = 2.0
+
+
+class FanOutResult:
+
+    def __init__(self):
+        self.results: dict = {}
+        self.failed: list = []
+        self.timings: dict = {}
+
+    @property
+    def partial(self) -> bool:
+        return bool(self.failed)
+
+    def headers(self) -> dict:
+        # Per-session durations, shown in the browser's network panel
+        return {"Server-Timing": ", ".join(
+            f"{key};dur={ms}" for key, ms in self.timings.items()
+        )}
+
+
+class FanOut:
+    # Runs one call per session database on a shared, bounded pool.
+    # Every call gets a pymongo timeout, so a slow year fails on its own
+    # instead of holding the whole response.
+
+    def __init__(
+        self,
+        max_workers: int = MAX_WORKERS,
+        timeout: float = SESSION_TIMEOUT,
+        queue_grace: float = QUEUE_GRACE
+    ):
+        self.timeout = timeout
+        self.queue_grace = queue_grace
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="fanout")
+        self._lock = Lock()
+        self._timings: dict = {}
+        self.timeouts = 0
+        self.errors = 0
+
+
+    def _timed(self, fn: Callable, key: Hashable):
+        started = time.perf_counter()
+        try:
+            with pymongo.timeout(self.timeout):
+                value = fn(key)
+        finally:
+            ms = round((time.perf_counter() - started) * 1000, 1)
+            self._record(key, ms)
+        return value, ms
+
+
+    def _record(self, key: Hashable, ms: float):
+        with self._lock:
+            entry = self._timings.setdefault(str(key), {"calls": 0, "total_ms": 0.0, "max_ms": 0.0})
+            entry["calls"] += 1
+            entry["total_ms"] += ms
+            entry["max_ms"] = max(entry["max_ms"], ms)
+            entry["last_ms"] = ms
+
+
+    def run(self, fn: Callable, keys: list) -> FanOutResult:
+        started = time.perf_counter()
+        # Each call sees the request's context, e.g. the transfer counter
+        futures = {
+            key: self._pool.submit(contextvars.copy_context().run, self._timed, fn, key)
+            for key in keys
+        }
+        wait(futures.values(), timeout=self.timeout + self.queue_grace)
+
+        result = FanOutResult()
+        waited = round((time.perf_counter() - started) * 1000, 1)
+        for key, future in futures.items():
+            if not future.done():
+                future.cancel()
+                self.timeouts += 1
+                result.failed.append(key)
+                result.timings[key] = waited
+                continue
+
+            error = future.exception()
+            if error is None:
+                result.results[key], result.timings[key] = future.result()
+                continue
+
+            if isinstance(error, PyMongoError) and error.timeout:
+                self.timeouts += 1
+            else:
+                self.errors += 1
+                logger.error("Fan-out call failed for %s", key, exc_info=error)
+            result.failed.append(key)
+            result.timings[key] = waited
+        return result
+
+
+    def stats(self) -> dict:
+        with self._lock:
+            sessions = {
+                key: {
+                    "calls": entry["calls"],
+                    "avg_ms": round(entry["total_ms"] / entry["calls"], 1),
+                    "max_ms": entry["max_ms"],
+                    "last_ms": entry["last_ms"]
+                }
+                for key, entry in sorted(self._timings.items())
+            }
+        return {
+            "sessions": sessions,
+            "timeouts": self.timeouts,
+            "errors": self.errors
+        }
+
+
+def check_partial(result: FanOutResult, allow_partial: bool):
+    if result.partial and not allow_partial:
+        raise HTTPException(
+            status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+            detail="Could not read Academic Sessions: " + ", ".join(map(str, result.failed))
+        )
+
+
+session_fanout = FanOut()
@@ -0,0 +1,128 @@
+import re
+import threading
+import time
+import requests
+from google.auth import jwt as google_jwt
+from utils.reader import GOOGLE_CERTS_URL
+
+GOOGLE_ISSUERS = ("accounts.google.com", "https://accounts.google.com")
+MAX_AGE_PATTERN = re.compile(r"max-age=(\d+)")
+
+DEFAULT_MAX_AGE = 300
+REFRESH_MARGIN = 60
+RETRY_INTERVAL = 30
+FETCH_TIMEOUT = 5
+
+
+class GoogleCertCache:
+
+    def __init__(self, certs_url: str):
+        self.certs_url = certs_url
+        self._session = requests.Session()
+        self._lock = threading.Lock()
+        self._certs: dict = {}
+        self._expires_at = 0.0
+        self._timer: threading.Timer | None = None
+        # When an unknown kid last forced a refetch of unexpired keys
+        self._kid_refetched_at = float("-inf")
+        self.hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.errors = 0
+        self.unknown_kids = 0
+
+
+    def _fetch(self) -> None:
+        response = self._session.get(self.certs_url, timeout=FETCH_TIMEOUT)
+        response.raise_for_status()
+        certs = response.json()
+
+        match = MAX_AGE_PATTERN.search(response.headers.get("Cache-Control", ""))
+        max_age = int(match.group(1)) if match else DEFAULT_MAX_AGE
+
+        self._certs = certs
+        self._expires_at = time.monotonic() + max_age
+        self.refreshes += 1
+        self._schedule_refresh(max(max_age - REFRESH_MARGIN, 1))
+
+
+    def _schedule_refresh(self, delay: float) -> None:
+        if self._timer:
+            self._timer.cancel()
+        self._timer = threading.Timer(delay, self._background_refresh)
+        self._timer.daemon = True
+        self._timer.start()
+
+
+    def _background_refresh(self) -> None:
+        with self._lock:
+            try:
+                self._fetch()
+            except Exception:
+                # Keep serving the old keys until they expire, retry sooner
+                self.errors += 1
+                self._schedule_refresh(RETRY_INTERVAL)
+
+
+    def _cached(self, kid: str | None) -> dict | None:
+        now = time.monotonic()
+        certs = self._certs
+        if now >= self._expires_at:
+            return None
+        if kid is None or kid in certs:
+            self.hits += 1
+            return certs
+        if now - self._kid_refetched_at < RETRY_INTERVAL:
+            # The kid comes from an unverified token, so after one refetch
+            # unknown ones are turned away until the cool-down passes;
+            # verification then fails against the current keys
+            self.unknown_kids += 1
+            return certs
+        return None
+
+
+    def get_certs(self, kid: str | None = None) -> dict:
+        certs = self._cached(kid)
+        if certs is not None:
+            return certs
+
+        with self._lock:
+            # Another request may have refreshed while we waited on the lock
+            certs = self._cached(kid)
+            if certs is not None:
+                return certs
+
+            self.misses += 1
+            if time.monotonic() < self._expires_at:
+                self._kid_refetched_at = time.monotonic()
+            self._fetch()
+            return self._certs
+
+
+    def verify(self, token: str, audience: str) -> dict:
+        kid = google_jwt.decode_header(token).get("kid")
+        idinfo = google_jwt.decode(
+            token,
+            certs=self.get_certs(kid),
+            audience=audience
+        )
+
+        if idinfo.get("iss") not in GOOGLE_ISSUERS:
+            raise ValueError("Wrong issuer")
+
+        return idinfo
+
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "refreshes": self.refreshes,
+            "errors": self.errors,
+            "unknown_kids": self.unknown_kids,
+            "keys": len(self._certs),
+            "expires_in": max(round(self._expires_at - time.monotonic()), 0)
+        }
+
+
+google_certs = GoogleCertCache(GOOGLE_CERTS_URL)
@@ -0,0 +1,229 @@
+import json
+import struct
+from bson import ObjectId
+from fastapi import HTTPException, Request
+from fastapi.responses import Response, StreamingResponse
+from gridfs import GridFS
+from pymongo.database import Database
+from utils.cache import ByteLRUCache
+from utils.disk_cache import CHUNK_SIZE, DiskCache
+from utils.etag import etag_matches, not_modified
+from utils.reader import IMAGE_DISK_CACHE, IMAGE_DISK_CACHE_BYTES
+from utils.variants import VARIANTS, find_variant
+
+# A file id never gets new content: update_event stores a new file and
+# deletes the old one, so browsers may keep an image for good
+IMAGE_CACHE_HEADERS = {"Cache-Control": "private, max-age=31536000, immutable"}
+
+THUMBNAIL_CACHE_BYTES = 32 * 1024 * 1024
+# Uploads are capped at 50KB, anything far larger is streamed uncached
+MAX_CACHED_IMAGE = 256 * 1024
+
+# (session db name, file id, size) -> (bytes, content type), where
+# size is a VARIANTS name or None for the original upload
+thumbnail_cache = ByteLRUCache(THUMBNAIL_CACHE_BYTES, MAX_CACHED_IMAGE)
+
+# When configured, images are served as files instead and never held
+# in memory. Keys are <session db name>/<file id>[_<size>].
+image_disk_cache = DiskCache(IMAGE_DISK_CACHE, IMAGE_DISK_CACHE_BYTES) if IMAGE_DISK_CACHE else None
+
+IMAGE_SIZES = [None, *VARIANTS]
+# A variant still being generated is stood in for by the original,
+# which must not be cached under the variant's URL
+FALLBACK_CACHE_HEADERS = {"Cache-Control": "private, no-cache"}
+
+
+def parse_image_id(image_id: str) -> ObjectId:
+    if not ObjectId.is_valid(image_id):
+        raise HTTPException(status_code=404, detail="Image not found")
+    return ObjectId(image_id)
+
+
+def check_image_size(size: str | None):
+    if size not in IMAGE_SIZES:
+        raise HTTPException(
+            status_code=400,
+            detail="size must be one of: " + ", ".join(VARIANTS)
+        )
+
+
+def image_etag(image_id: ObjectId, size: str | None = None) -> str:
+    return f'"{image_id}-{size}"' if size else f'"{image_id}"'
+
+
+def disk_key(image_id: ObjectId, size: str | None) -> str:
+    return f"{image_id}_{size}" if size else str(image_id)
+
+
+def forget_image(db_name: str, image_id) -> None:
+    # For files being replaced or deleted, variants included
+    image_oid = ObjectId(image_id)
+    for size in IMAGE_SIZES:
+        thumbnail_cache.pop((db_name, image_oid, size))
+        if image_disk_cache is not None:
+            image_disk_cache.forget(db_name, disk_key(image_oid, size))
+
+
+def open_image(fs: GridFS, image_oid: ObjectId, size: str | None = None):
+    # The variant if asked for and ready, else None; the original
+    # otherwise, 404 if it does not exist
+    if size:
+        variant = find_variant(fs, image_oid, size)
+        if variant is not None and variant.metadata.get("failed"):
+            # Could not be resized, the original stands in for good
+            return open_image(fs, image_oid)
+        return variant
+    try:
+        return fs.get(image_oid)
+    except Exception:
+        raise HTTPException(status_code=404, detail="Image not found")
+
+
+def stream_file(f):
+    with f:
+        yield from iter(lambda: f.read(CHUNK_SIZE), b"")
+
+
+def disk_image_response(db_name: str, fs: GridFS, image_oid: ObjectId, size: str | None, headers: dict):
+    key = disk_key(image_oid, size)
+    # An object that vanished since its id was written is a miss
+    cached = image_disk_cache.get(db_name, key)
+    if cached is None:
+        grid_out = open_image(fs, image_oid, size)
+        if grid_out is None:
+            return None
+        content_type = grid_out.content_type or "image/jpeg"
+        # Copied chunk by chunk, the image is never whole in memory
+        f, length = image_disk_cache.put(db_name, key, grid_out, content_type)
+    else:
+        f, content_type, length = cached
+
+    # Read from the descriptor opened above rather than the path, which
+    # an eviction may unlink before the body is sent
+    return StreamingResponse(
+        stream_file(f),
+        media_type=content_type,
+        headers={"Content-Length": str(length), **headers}
+    )
+
+
+def memory_image_response(db_name: str, fs: GridFS, image_oid: ObjectId, size: str | None, headers: dict):
+    cached = thumbnail_cache.get((db_name, image_oid, size))
+    if cached is not None:
+        data, content_type = cached
+        return Response(content=data, media_type=content_type, headers=headers)
+
+    grid_out = open_image(fs, image_oid, size)
+    if grid_out is None:
+        return None
+    content_type = grid_out.content_type or "image/jpeg"
+    if grid_out.length > MAX_CACHED_IMAGE:
+        return StreamingResponse(
+            grid_out,
+            media_type=content_type,
+            headers={"Content-Length": str(grid_out.length), **headers}
+        )
+
+    data = grid_out.read()
+    thumbnail_cache.set((db_name, image_oid, size), data, content_type)
+    return Response(content=data, media_type=content_type, headers=headers)
+
+
+def image_response(request: Request, db_name: str, fs: GridFS, image_id: str, size: str | None = None):
+    check_image_size(size)
+    image_oid = parse_image_id(image_id)
+    etag = image_etag(image_oid, size)
+
+    # Answered from the id alone, GridFS is never opened
+    if etag_matches(request, etag):
+        return not_modified(etag, IMAGE_CACHE_HEADERS)
+
+    serve = disk_image_response if image_disk_cache is not None else memory_image_response
+    response = serve(db_name, fs, image_oid, size, {"ETag": etag, **IMAGE_CACHE_HEADERS})
+    if response is None:
+        response = serve(db_name, fs, image_oid, None, {"ETag": image_etag(image_oid), **FALLBACK_CACHE_HEADERS})
+    return response
+
+
+def read_files(db: Database, query: dict) -> dict:
+    # file id -> (bytes, file document), with the chunks of every
+    # matching file fetched in a single $in query
+    files = {f["_id"]: f for f in db["fs.files"].find(query, {"length": 1, "contentType": 1, "metadata": 1})}
+    parts = {file_id: [] for file_id in files}
+    chunks = db["fs.chunks"].find(
+        {"files_id": {"$in": list(files)}},
+        {"files_id": 1, "data": 1}
+    ).sort([("files_id", 1), ("n", 1)])
+    for chunk in chunks:
+        parts[chunk["files_id"]].append(chunk["data"])
+
+    result = {}
+    for file_id, f in files.items():
+        data = b"".join(parts[file_id])
+        # A length mismatch means it was deleted between the two reads
+        if len(data) == f["length"]:
+            result[file_id] = (data, f)
+    return result
+
+
+def load_images(db_name: str, db: Database, image_oids: list[ObjectId], size: str | None = None) -> dict:
+    # file id -> (bytes, content type) for every id that exists, as the
+    # size variant where one is ready; what the memory cache lacks is
+    # read with one fs.files and one fs.chunks query
+    found = {}
+    wanted = []
+    for image_oid in image_oids:
+        cached = thumbnail_cache.get((db_name, image_oid, size))
+        if cached is not None:
+            found[image_oid] = cached
+        else:
+            wanted.append(image_oid)
+    if not wanted:
+        return found
+
+    match = [{"_id": {"$in": wanted}}]
+    if size:
+        match.append({"metadata.variant_of": {"$in": wanted}, "metadata.size": size})
+    # Larger files are left to the single image routes
+    files = read_files(db, {"$or": match, "length": {"$lte": MAX_CACHED_IMAGE}})
+
+    originals = {}
+    failed = []
+    for file_id, (data, f) in files.items():
+        content_type = f.get("contentType") or "image/jpeg"
+        metadata = f.get("metadata") or {}
+        variant_of = metadata.get("variant_of")
+        if metadata.get("failed"):
+            # The original, read by the same query, stands in for good
+            failed.append(variant_of)
+            continue
+        if variant_of is not None:
+            thumbnail_cache.set((db_name, variant_of, size), data, content_type)
+            found[variant_of] = (data, content_type)
+        else:
+            thumbnail_cache.set((db_name, file_id, None), data, content_type)
+            originals[file_id] = (data, content_type)
+
+    for image_oid in failed:
+        if image_oid in originals:
+            thumbnail_cache.set((db_name, image_oid, size), *originals[image_oid])
+    for image_oid, image in originals.items():
+        found.setdefault(image_oid, image)
+    return found
+
+
+def pack_images(entries: list[dict], images: list) -> bytes:
+    # <4-byte big-endian index length><JSON index><image bytes...>
+    # Each index entry gains offset and length into the bytes that
+    # follow, or found: false
+    body = bytearray()
+    for entry, image in zip(entries, images):
+        if image is None:
+            entry["found"] = False
+            continue
+        data, content_type = image
+        entry.update({"found": True, "content_type": content_type, "offset": len(body), "length": len(data)})
+        body += data
+
+    index = json.dumps(entries, separators=(",", ":")).encode()
+    return struct.pack(">I", len(index)) + index + bytes(body)
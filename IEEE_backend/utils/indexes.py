@@ -0,0 +1,94 @@
+import logging
+from pymongo import ASCENDING, IndexModel
+from pymongo.collection import Collection
+from pymongo.database import Database
+
+logger = logging.getLogger(__name__)
+
+
+# Indexes backing the hot lookups of each YYYY_YYYY session database
+SESSION_INDEXES = {
+    "user": [
+        IndexModel([("email", ASCENDING)], name="email"),
+        # Keyset paging of the admin listings sorts on (field, _id)
+        IndexModel([("name", ASCENDING), ("_id", ASCENDING)], name="name_id"),
+        IndexModel([("college_or_university", ASCENDING), ("_id", ASCENDING)], name="college_or_university_id"),
+    ],
+    "event": [
+        IndexModel([("event_date", ASCENDING), ("_id", ASCENDING)], name="event_date_id"),
+    ],
+    "team": [
+        IndexModel([("event_id", ASCENDING), ("team_name", ASCENDING)], name="event_id_team_name"),
+        IndexModel([("event_id", ASCENDING), ("team_code", ASCENDING)], name="event_id_team_code"),
+        IndexModel([("team_name", ASCENDING), ("_id", ASCENDING)], name="team_name_id"),
+        IndexModel([("registered_on", ASCENDING), ("_id", ASCENDING)], name="registered_on_id"),
+    ],
+    "registration": [
+        IndexModel([("event_id", ASCENDING), ("user_id", ASCENDING)], name="event_id_user_id", unique=True),
+        IndexModel([("user_id", ASCENDING)], name="user_id"),
+        IndexModel([("event_id", ASCENDING), ("team_id", ASCENDING)], name="event_id_team_id"),
+    ],
+    "fs.files": [
+        IndexModel([("metadata.variant_of", ASCENDING), ("metadata.size", ASCENDING)], name="variant_of_size"),
+    ],
+    "event_seats": [
+        IndexModel([("event_id", ASCENDING), ("shard", ASCENDING)], name="event_id_shard", unique=True),
+    ],
+}
+
+# Indexes for the credentials database, admin_YYYY_YYYY and superadmin
+CREDENTIAL_INDEXES = [
+    IndexModel([("email", ASCENDING)], name="email"),
+]
+
+
+def ensure_collection_indexes(collection: Collection, indexes: list[IndexModel]) -> list[str]:
+    # create_indexes is a no-op for indexes that already exist
+    return collection.create_indexes(indexes)
+
+
+def ensure_session_indexes(db: Database) -> dict:
+    created = {}
+    for coll_name, indexes in SESSION_INDEXES.items():
+        created[coll_name] = ensure_collection_indexes(db[coll_name], indexes)
+    return created
+
+
+def ensure_credential_indexes(admin_collection: Collection, superadmin_collection: Collection):
+    ensure_collection_indexes(admin_collection, CREDENTIAL_INDEXES)
+    ensure_collection_indexes(superadmin_collection, CREDENTIAL_INDEXES)
+
+
+def safe_ensure_indexes(handles, superadmin_collection: Collection):
+    # Index bootstrap must never take a request down with it
+    try:
+        ensure_session_indexes(handles.db)
+        ensure_credential_indexes(handles.admin, superadmin_collection)
+    except Exception:
+        logger.exception("Index bootstrap failed for %s", handles.db_name)
+
+
+def index_report(db: Database) -> dict:
+    report = {}
+    for coll_name, indexes in SESSION_INDEXES.items():
+        collection = db[coll_name]
+        existing = collection.index_information()
+        required = [index.document["name"] for index in indexes]
+
+        usage = {}
+        try:
+            for stat in collection.aggregate([{"$indexStats": {}}]):
+                usage[stat["name"]] = stat["accesses"]["ops"]
+        except Exception:
+            usage = {}
+
+        report[coll_name] = {
+            "missing": [name for name in required if name not in existing],
+            "unused": [
+                name for name, ops in usage.items()
+                if ops == 0 and name != "_id_"
+            ],
+            "usage": usage
+        }
+
+    return report
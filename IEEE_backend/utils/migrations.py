@@ -0,0 +1,157 @@
+import logging
+from datetime import datetime
+from pymongo import UpdateOne
+from pymongo.database import Database
+from utils.indexes import ensure_session_indexes
+from utils.time import IST
+from utils.seats import init_seats
+
+logger = logging.getLogger(__name__)
+
+REGISTRATIONS_MIGRATION = "registrations_v1"
+SEATS_MIGRATION = "seats_v1"
+BATCH_SIZE = 500
+
+LEGACY_EVENT_FIELDS = ["registered_user", "registered_team", "remarked_user", "remarked_team"]
+
+
+def registration_upsert(event_id, user_id, fields: dict) -> UpdateOne:
+    # $setOnInsert never overwrites a registration written by the new code
+    return UpdateOne(
+        {"event_id": event_id, "user_id": user_id},
+        {"$setOnInsert": {"event_id": event_id, "user_id": user_id, **fields}},
+        upsert=True
+    )
+
+
+def flush(db: Database, ops: list) -> int:
+    if not ops:
+        return 0
+    result = db["registration"].bulk_write(ops, ordered=False)
+    ops.clear()
+    return result.upserted_count
+
+
+def migrate_registrations(db: Database) -> int:
+    # Moves user.registered_event[] and event.registered_user[] into the
+    # registration collection. Safe to re-run and to run while serving.
+    migrations = db["migrations"]
+    if migrations.find_one({"_id": REGISTRATIONS_MIGRATION, "done": True}):
+        return 0
+
+    ensure_session_indexes(db)
+
+    ops = []
+    migrated = 0
+
+    users_cursor = db["user"].find(
+        {"registered_event.0": {"$exists": True}},
+        {"registered_event": 1}
+    )
+    for user in users_cursor:
+        for reg in user["registered_event"]:
+            if not reg.get("event_id"):
+                continue
+
+            fields = {"registered_on": reg.get("registered_on")}
+            if reg.get("team_id"):
+                fields["team_id"] = reg["team_id"]
+            if "remark" in reg:
+                fields["remark"] = reg["remark"]
+
+            ops.append(registration_upsert(reg["event_id"], user["_id"], fields))
+            if len(ops) >= BATCH_SIZE:
+                migrated += flush(db, ops)
+
+    # Event-side entries whose user-side copy went missing
+    events_cursor = db["event"].find(
+        {"registered_user.0": {"$exists": True}},
+        {"registered_user": 1}
+    )
+    for event in events_cursor:
+        for user_id in event["registered_user"]:
+            ops.append(registration_upsert(event["_id"], user_id, {"registered_on": None}))
+            if len(ops) >= BATCH_SIZE:
+                migrated += flush(db, ops)
+
+    migrated += flush(db, ops)
+
+    # Legacy arrays are dropped only after every registration has a document
+    db["user"].update_many(
+        {"registered_event": {"$exists": True}},
+        {"$unset": {"registered_event": ""}}
+    )
+    db["event"].update_many(
+        {},
+        {"$unset": {field: "" for field in LEGACY_EVENT_FIELDS}}
+    )
+    if "registered_event_event_id" in db["user"].index_information():
+        db["user"].drop_index("registered_event_event_id")
+
+    migrations.update_one(
+        {"_id": REGISTRATIONS_MIGRATION},
+        {"$set": {
+            "done": True,
+            "migrated": migrated,
+            "completed_on": datetime.now(IST).isoformat()
+        }},
+        upsert=True
+    )
+
+    return migrated
+
+
+def migrate_seats(db: Database) -> int:
+    # Seeds seat counters for events that were capped before capacity
+    # was enforced. Runs after the registration migration.
+    migrations = db["migrations"]
+    if migrations.find_one({"_id": SEATS_MIGRATION, "done": True}):
+        return 0
+
+    migrated = 0
+    for event in db["event"].find({"event_capacity": {"$ne": None}}, {"event_capacity": 1}):
+        if db["event_seats"].count_documents({"event_id": event["_id"]}, limit=1):
+            continue
+        taken = db["registration"].count_documents({"event_id": event["_id"]})
+        init_seats(db["event_seats"], event["_id"], event["event_capacity"], taken)
+        migrated += 1
+
+    migrations.update_one(
+        {"_id": SEATS_MIGRATION},
+        {"$set": {
+            "done": True,
+            "migrated": migrated,
+            "completed_on": datetime.now(IST).isoformat()
+        }},
+        upsert=True
+    )
+
+    return migrated
+
+
+MIGRATIONS = [
+    (REGISTRATIONS_MIGRATION, migrate_registrations),
+    (SEATS_MIGRATION, migrate_seats),
+]
+
+
+def migrate_sessions(db_names: list[str], client) -> dict:
+    result = {}
+    for db_name in db_names:
+        result[db_name] = {}
+        for name, migrate in MIGRATIONS:
+            try:
+                result[db_name][name] = migrate(client[db_name])
+            except Exception:
+                logger.exception("Migration %s failed for %s", name, db_name)
+                result[db_name][name] = None
+                break
+    return result
+
+
+if __name__ == "__main__":
+    from database import client
+    from utils.pattern import session_catalog
+
+    for db_name, migrated in migrate_sessions(session_catalog.session_dbs(), client).items():
+        print(f"{db_name}: {migrated}")
@@ -0,0 +1,143 @@
+import base64
+import binascii
+import json
+from typing import Literal
+from bson import ObjectId
+from fastapi import HTTPException, Query, status
+from pymongo import ASCENDING, DESCENDING
+from pymongo.collection import Collection
+
+MAX_LIMIT = 200
+# What a sort value may be; anything else in a cursor, a dict above all,
+# would reach the query as an operator
+CURSOR_VALUE_TYPES = (str, int, float, bool, type(None))
+
+
+def bad_request(detail: str) -> HTTPException:
+    return HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=detail)
+
+
+def encode_cursor(field: str, value, doc_id) -> str:
+    raw = json.dumps([field, value, str(doc_id)], separators=(",", ":"), default=str)
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, field: str) -> tuple:
+    # A cursor only continues the sort it was issued for
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        cursor_field, value, doc_id = json.loads(raw)
+    except (binascii.Error, ValueError, TypeError):
+        raise bad_request("Invalid cursor")
+    if cursor_field != field or not isinstance(value, CURSOR_VALUE_TYPES) or not isinstance(doc_id, str):
+        raise bad_request("Invalid cursor")
+    if not ObjectId.is_valid(doc_id):
+        raise bad_request("Invalid cursor")
+    return value, ObjectId(doc_id)
+
+
+class Page:
+    # Keyset paging on (field, _id): "after" carries the last row's sort
+    # value and _id, so each page is an index range scan rather than a
+    # skip over everything before it. A missing field sorts first, as in
+    # MongoDB.
+
+    def __init__(self, field: str, descending: bool, limit: int | None, after: str | None):
+        self.field = field
+        self.descending = descending
+        self.limit = limit
+        self.after = decode_cursor(after, field) if after else None
+        self.next: str | None = None
+
+
+    def sort(self) -> list:
+        direction = DESCENDING if self.descending else ASCENDING
+        if self.field == "_id":
+            return [("_id", direction)]
+        return [(self.field, direction), ("_id", direction)]
+
+
+    def _after_filter(self) -> dict:
+        value, doc_id = self.after
+        past = "$lt" if self.descending else "$gt"
+        if self.field == "_id":
+            return {"_id": {past: doc_id}}
+
+        same_value = {self.field: value, "_id": {past: doc_id}}
+        if value is None:
+            # Missing values come first ascending and last descending
+            return same_value if self.descending else {"$or": [same_value, {self.field: {"$ne": None}}]}
+
+        later = [{self.field: {past: value}}, same_value]
+        if self.descending:
+            later.append({self.field: None})
+        return {"$or": later}
+
+
+    def find(self, collection: Collection, query: dict, projection: dict | None = None) -> list:
+        if self.after:
+            query = {"$and": [query, self._after_filter()]} if query else self._after_filter()
+
+        cursor = collection.find(query, projection).sort(self.sort())
+        if self.limit is None:
+            return list(cursor)
+
+        # One extra row tells whether there is a next page
+        docs = list(cursor.limit(self.limit + 1))
+        return self._cut(docs, lambda doc: (doc.get(self.field), doc["_id"]))
+
+
+    def slice(self, rows: list[dict], id_key: str = "_id") -> list[dict]:
+        # The same paging over rows already in memory, e.g. a cached catalog
+        def key(row):
+            value = row.get(self.field) if self.field != "_id" else None
+            return (value is not None, value, str(row[id_key]))
+
+        rows = sorted(rows, key=key, reverse=self.descending)
+        if self.after:
+            value, doc_id = self.after
+            mark = (value is not None, value, str(doc_id))
+            if self.field == "_id":
+                mark = (False, None, str(doc_id))
+            try:
+                rows = [row for row in rows if (key(row) < mark if self.descending else key(row) > mark)]
+            except TypeError:
+                # A value of another type than the field holds
+                raise bad_request("Invalid cursor")
+
+        if self.limit is None:
+            return rows
+        return self._cut(rows[:self.limit + 1], lambda row: (row.get(self.field), row[id_key]))
+
+
+    def _cut(self, docs: list, position) -> list:
+        if len(docs) <= self.limit:
+            return docs
+        docs = docs[:self.limit]
+        value, doc_id = position(docs[-1])
+        self.next = encode_cursor(self.field, None if self.field == "_id" else value, doc_id)
+        return docs
+
+
+def page_params(sort_fields: dict[str, str]):
+    # sort_fields maps the public sort keys to document fields
+    def params(
+        limit: int | None = Query(None, ge=1, le=MAX_LIMIT),
+        after: str | None = None,
+        sort: str = "id",
+        order: Literal["asc", "desc"] = "asc"
+    ) -> Page:
+        if sort == "id":
+            field = "_id"
+        elif sort in sort_fields:
+            field = sort_fields[sort]
+        else:
+            raise bad_request("sort must be one of: " + ", ".join(["id", *sort_fields]))
+        return Page(field, order == "desc", limit, after)
+
+    return params
+
+
+def has_field(field: str, present: bool) -> dict:
+    # Filter on a field being set, treating null like missing
+    return {field: {"$ne": None}} if present else {field: None}
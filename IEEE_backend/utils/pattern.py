@@ -1,9 +1,65 @@
 import re
+import time
+from threading import Lock
 from fastapi import HTTPException, status
-from database import client
+from database import client, credentials_db
 
 DB_PATTERN = re.compile(r"^\d{4}_\d{4}$")
 
+CATALOG_TTL = 300
+# Unknown names force a refresh, but at most this often
+CATALOG_MIN_REFRESH = 5
+
+
+class SessionCatalog:
+
+    def __init__(self):
+        self._lock = Lock()
+        self._session_dbs: list[str] = []
+        self._admin_collections: list[str] = []
+        self._refreshed_at = 0.0
+
+    def refresh(self):
+        with self._lock:
+            self._session_dbs = sorted(
+                name for name in client.list_database_names()
+                if DB_PATTERN.match(name)
+            )
+            self._admin_collections = sorted(
+                name for name in credentials_db.list_collection_names()
+                if name.startswith("admin_") and DB_PATTERN.match(name[6:])
+            )
+            self._refreshed_at = time.monotonic()
+
+    def _ensure_fresh(self, force: bool = False):
+        age = time.monotonic() - self._refreshed_at
+        if age > CATALOG_TTL or (force and age > CATALOG_MIN_REFRESH):
+            self.refresh()
+
+    def session_dbs(self) -> list[str]:
+        self._ensure_fresh()
+        return list(self._session_dbs)
+
+    def admin_collections(self) -> list[str]:
+        self._ensure_fresh()
+        return list(self._admin_collections)
+
+    def has_session_db(self, db_name: str) -> bool:
+        self._ensure_fresh()
+        if db_name not in self._session_dbs:
+            # A session database may have been created since the last refresh
+            self._ensure_fresh(force=True)
+        return db_name in self._session_dbs
+
+    def has_admin_collection(self, collection_name: str) -> bool:
+        self._ensure_fresh()
+        if collection_name not in self._admin_collections:
+            self._ensure_fresh(force=True)
+        return collection_name in self._admin_collections
+
+
+session_catalog = SessionCatalog()
+
 
 def verify_session_db(db_name: str) -> str:
 
@@ -13,9 +69,7 @@ def verify_session_db(db_name: str) -> str:
             detail="Invalid database format. Expected YYYY_YYYY"
         )
 
-    existing_dbs = client.list_database_names()
-
-    if db_name not in existing_dbs:
+    if not session_catalog.has_session_db(db_name):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="This Academic Session database does not exist"
@@ -33,15 +87,11 @@ def verify_admin_collection(collection_name: str) -> str:
         )
 
     collection_name = "admin_" + collection_name
-    db = client["credentials"]
-    existing_coll = db.list_collection_names()
 
-    if collection_name not in existing_coll:
+    if not session_catalog.has_admin_collection(collection_name):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="This Academic Session collection does not exist"
         )
 
     return collection_name
-
-
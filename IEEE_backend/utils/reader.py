@@ -6,4 +6,15 @@ uri = os.getenv("connection_string")
 GOOGLE_CLIENT_ID = os.getenv("GOOGLE_CLIENT_ID")
 JWT_SECRET = os.getenv("JWT_SECRET")
 JWT_ALGO = os.getenv("JWT_ALGO")
-Frontend = os.getenv("Frontend")
\ No newline at end of file
+Frontend = os.getenv("Frontend")
+GOOGLE_CERTS_URL = os.getenv("GOOGLE_CERTS_URL", "https://www.googleapis.com/oauth2/v1/certs")
+# "on" queues /users/register-event inserts and writes them in batches
+REGISTRATION_BUFFER = os.getenv("REGISTRATION_BUFFER", "off").lower() == "on"
+# "on" records the bytes each route reads from MongoDB, see /super/db-transfer
+DB_TRANSFER_STATS = os.getenv("DB_TRANSFER_STATS", "off").lower() == "on"
+# Directory for the on-disk image cache, unset keeps images in memory only
+# The byte cap applies to each worker, not to the shared directory
+IMAGE_DISK_CACHE = os.getenv("IMAGE_DISK_CACHE")
+IMAGE_DISK_CACHE_BYTES = int(os.getenv("IMAGE_DISK_CACHE_BYTES", str(512 * 1024 * 1024)))
+# Key for signed image URLs, defaults to the JWT secret
+IMAGE_URL_SECRET = os.getenv("IMAGE_URL_SECRET", JWT_SECRET or "")
@@ -0,0 +1,91 @@
+import random
+from bson import ObjectId
+from pymongo import UpdateOne
+from pymongo.collection import Collection
+from pymongo.asynchronous.collection import AsyncCollection
+
+# A capped event's seats are spread over up to this many counter documents,
+# so concurrent registrants mostly decrement different documents
+SEAT_SHARDS = 8
+
+
+def split_capacity(capacity: int, shards: int) -> list[int]:
+    base, extra = divmod(capacity, shards)
+    return [base + (1 if i < extra else 0) for i in range(shards)]
+
+
+def shard_count(capacity: int) -> int:
+    return max(min(SEAT_SHARDS, capacity), 1)
+
+
+def init_seats(seats: Collection, event_id: ObjectId, capacity: int, taken: int = 0):
+    remaining = max(capacity - taken, 0)
+    shards = shard_count(capacity)
+
+    seats.delete_many({"event_id": event_id})
+    seats.insert_many([
+        {"event_id": event_id, "shard": shard, "remaining": count}
+        for shard, count in enumerate(split_capacity(remaining, shards))
+    ])
+
+
+def resize_seats(
+    seats: Collection,
+    registration: Collection,
+    event_id: ObjectId,
+    old_capacity: int | None,
+    new_capacity: int
+):
+    shards = seats.distinct("shard", {"event_id": event_id})
+    if old_capacity is None or not shards:
+        taken = registration.count_documents({"event_id": event_id})
+        init_seats(seats, event_id, new_capacity, taken)
+        return
+
+    # Shifting every shard by its part of the delta keeps in-flight
+    # allocations valid. A shard may go negative when capacity shrinks
+    # below the seats already taken, it then just hands out nothing.
+    delta = new_capacity - old_capacity
+    if delta == 0:
+        return
+
+    sign = 1 if delta > 0 else -1
+    seats.bulk_write([
+        UpdateOne(
+            {"event_id": event_id, "shard": shard},
+            {"$inc": {"remaining": sign * count}}
+        )
+        for shard, count in zip(sorted(shards), split_capacity(abs(delta), len(shards)))
+        if count
+    ])
+
+
+def drop_seats(seats: Collection, event_id: ObjectId):
+    seats.delete_many({"event_id": event_id})
+
+
+async def allocate_seat(seats: AsyncCollection, event_id: ObjectId, shards: int) -> int | None:
+    # Try one random shard first, then take whichever shard still has room
+    shard = random.randrange(shards)
+    taken = await seats.find_one_and_update(
+        {"event_id": event_id, "shard": shard, "remaining": {"$gt": 0}},
+        {"$inc": {"remaining": -1}},
+        projection={"shard": 1}
+    )
+    if taken is None:
+        taken = await seats.find_one_and_update(
+            {"event_id": event_id, "remaining": {"$gt": 0}},
+            {"$inc": {"remaining": -1}},
+            projection={"shard": 1}
+        )
+
+    return taken["shard"] if taken else None
+
+
+async def release_seat(seats: AsyncCollection, event_id: ObjectId, shard: int | None):
+    # Registrations from before the event was capped carry no shard,
+    # their seat was subtracted from the total and goes back to shard 0
+    await seats.update_one(
+        {"event_id": event_id, "shard": shard or 0},
+        {"$inc": {"remaining": 1}}
+    )
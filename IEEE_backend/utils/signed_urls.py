@@ -0,0 +1,43 @@
+import hashlib
+import hmac
+import time
+from fastapi import HTTPException, status
+from utils.reader import IMAGE_URL_SECRET
+
+# URLs are issued per window, so a page polled within one window keeps
+# the same image URLs and the browser cache keeps hitting
+URL_WINDOW = 900
+# How long a URL stays valid after its window ends
+IMAGE_URL_TTL = 3600
+
+IMAGE_URL_PREFIX = "/users/signed-image"
+
+_key = hashlib.sha256(b"image-url:" + IMAGE_URL_SECRET.encode()).digest()
+
+
+def url_window(now: float | None = None) -> int:
+    return int(time.time() if now is None else now) // URL_WINDOW
+
+
+def image_signature(db_name: str, image_id: str, exp: int) -> str:
+    message = f"{db_name}/{image_id}/{exp}".encode()
+    return hmac.new(_key, message, hashlib.sha256).hexdigest()[:32]
+
+
+def sign_image_url(db_name: str, image_id, window: int | None = None) -> str | None:
+    if not image_id or image_id == "None":
+        return None
+    if window is None:
+        window = url_window()
+    exp = (window + 1) * URL_WINDOW + IMAGE_URL_TTL
+    return f"{IMAGE_URL_PREFIX}/{db_name}/{image_id}?exp={exp}&sig={image_signature(db_name, str(image_id), exp)}"
+
+
+def verify_image_signature(db_name: str, image_id: str, exp: int, sig: str):
+    # Pure CPU: no token, no database
+    expected = image_signature(db_name, image_id, exp)
+    if not hmac.compare_digest(expected, sig) or exp < time.time():
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Invalid or expired image URL"
+        )
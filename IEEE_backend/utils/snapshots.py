@@ -0,0 +1,199 @@
+import json
+import logging
+import time
+import zlib
+from datetime import datetime
+from threading import Lock
+from typing import Callable
+from bson import Binary
+from fastapi.responses import Response
+from pymongo.database import Database
+from database import client, current_session
+from utils.time import IST
+from utils.fanout import session_fanout, check_partial
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_COLLECTION = "snapshots"
+# Bump when a view's output changes so stored snapshots are rebuilt
+SNAPSHOT_FORMAT = 1
+# How long a loaded snapshot is served before its built_on is re-read,
+# so a rebuild in another worker or the CLI shows up everywhere
+SNAPSHOT_CHECK_INTERVAL = 10
+
+
+def render(data) -> bytes:
+    return json.dumps(data, separators=(",", ":"), default=str).encode()
+
+
+class SessionSnapshots:
+    # A session never changes after its July rollover, so each
+    # cross-session view of a closed session is rendered once, stored
+    # compressed in that session's database and spliced into responses
+    # as-is. Only the current session is still read live.
+
+    def __init__(self):
+        self._lock = Lock()
+        self._views: dict[str, Callable[[Database], object]] = {}
+        self._expanders: dict[str, tuple[Callable, Callable]] = {}
+        # (db_name, view) -> (built_on, body, checked at)
+        self._rendered: dict[tuple[str, str], tuple[str, bytes, float]] = {}
+        self._expanded: dict[tuple[str, str], tuple] = {}
+        self.hits = 0
+        self.revalidations = 0
+        self.loads = 0
+        self.builds = 0
+
+
+    def view(self, name: str, expand: Callable | None = None, expand_key: Callable | None = None):
+        # Registers builder(db) -> JSON-ready data for one session.
+        # expand(db_name, data) adds what must not be stored, e.g. signed
+        # URLs, and is re-applied whenever expand_key() changes.
+        def register(builder):
+            self._views[name] = builder
+            if expand is not None:
+                self._expanders[name] = (expand, expand_key)
+            return builder
+        return register
+
+
+    def is_closed(self, db_name: str) -> bool:
+        # YYYY_YYYY names sort chronologically
+        return db_name < current_session()
+
+
+    def build(self, db_name: str, name: str) -> bytes:
+        body = render(self._views[name](client[db_name]))
+        built_on = datetime.now(IST).isoformat()
+        client[db_name][SNAPSHOT_COLLECTION].replace_one(
+            {"_id": name},
+            {
+                "format": SNAPSHOT_FORMAT,
+                "body": Binary(zlib.compress(body)),
+                "size": len(body),
+                "built_on": built_on
+            },
+            upsert=True
+        )
+        with self._lock:
+            self._rendered[(db_name, name)] = (built_on, body, time.monotonic())
+            self.builds += 1
+        return body
+
+
+    def _loaded(self, db_name: str, name: str) -> tuple[str, bytes]:
+        # (built_on, body); built_on tells renders of the same view apart
+        key = (db_name, name)
+        cached = self._rendered.get(key)
+        if cached is not None and time.monotonic() - cached[2] < SNAPSHOT_CHECK_INTERVAL:
+            self.hits += 1
+            return cached[0], cached[1]
+
+        collection = client[db_name][SNAPSHOT_COLLECTION]
+        query = {"_id": name, "format": SNAPSHOT_FORMAT}
+        stamp = collection.find_one(query, {"built_on": 1})
+        if stamp is not None and cached is not None and stamp["built_on"] == cached[0]:
+            with self._lock:
+                self._rendered[key] = (cached[0], cached[1], time.monotonic())
+                self.revalidations += 1
+            return cached[0], cached[1]
+
+        doc = collection.find_one(query, {"body": 1, "built_on": 1}) if stamp is not None else None
+        if doc is None:
+            # Closed since the last startup, or built by an older format
+            self.build(db_name, name)
+            return self._rendered[key][:2]
+
+        body = zlib.decompress(doc["body"])
+        with self._lock:
+            self._rendered[key] = (doc["built_on"], body, time.monotonic())
+            self.loads += 1
+        return doc["built_on"], body
+
+
+    def rendered(self, db_name: str, name: str) -> bytes:
+        return self._loaded(db_name, name)[1]
+
+
+    def session_body(self, db_name: str, name: str) -> bytes:
+        expand, expand_key = self._expanders.get(name, (None, None))
+
+        if not self.is_closed(db_name):
+            data = self._views[name](client[db_name])
+            return render(expand(db_name, data) if expand else data)
+
+        built_on, body = self._loaded(db_name, name)
+        if expand is None:
+            return body
+
+        key = (built_on, expand_key())
+        cached = self._expanded.get((db_name, name))
+        if cached is not None and cached[0] == key:
+            return cached[1]
+        body = render(expand(db_name, json.loads(body)))
+        with self._lock:
+            self._expanded[(db_name, name)] = (key, body)
+        return body
+
+
+    def response(self, name: str, db_names: list[str], allow_partial: bool = False) -> Response:
+        # {"success": true, "data": {db_name: view, ...}} without
+        # re-serialising the stored snapshots. Sessions are read
+        # concurrently; with allow_partial the ones that failed are
+        # listed instead of failing the request.
+        result = session_fanout.run(lambda db_name: self.session_body(db_name, name), db_names)
+        check_partial(result, allow_partial)
+
+        parts = [
+            render(db_name) + b":" + body
+            for db_name, body in result.results.items()
+        ]
+        body = b'{"success":true,"data":{' + b",".join(parts) + b"}"
+        if result.partial:
+            body += b',"partial":true,"failed_sessions":' + render(result.failed)
+        body += b"}"
+        return Response(content=body, media_type="application/json", headers=result.headers())
+
+
+    def build_closed(self, db_names: list[str], rebuild: bool = False) -> dict:
+        # Without rebuild only missing or outdated snapshots are built
+        result = {}
+        for db_name in db_names:
+            if not self.is_closed(db_name):
+                continue
+            result[db_name] = {}
+            for name in self._views:
+                try:
+                    body = self.build(db_name, name) if rebuild else self.rendered(db_name, name)
+                    result[db_name][name] = len(body)
+                except Exception:
+                    logger.exception("Snapshot %s failed for %s", name, db_name)
+                    result[db_name][name] = None
+        return result
+
+
+    def stats(self) -> dict:
+        return {
+            "views": sorted(self._views),
+            "snapshots": len(self._rendered),
+            "bytes": sum(len(body) for _, body, _ in list(self._rendered.values())),
+            "hits": self.hits,
+            "revalidations": self.revalidations,
+            "loads": self.loads,
+            "builds": self.builds
+        }
+
+
+session_snapshots = SessionSnapshots()
+
+
+if __name__ == "__main__":
+    import sys
+    # The views register on utils.snapshots, not on this __main__ copy
+    import routes.user, routes.rootEvent, routes.rootTeam, routes.rootUser
+    from utils.snapshots import session_snapshots as snapshots
+    from utils.pattern import session_catalog
+
+    rebuild = "--rebuild" in sys.argv
+    for db_name, built in snapshots.build_closed(session_catalog.session_dbs(), rebuild).items():
+        print(f"{db_name}: {built}")
@@ -0,0 +1,61 @@
+import contextvars
+from threading import Lock
+import bson
+from pymongo import monitoring
+from utils.reader import DB_TRANSFER_STATS
+
+# Per-request counter, set by the middleware in main.py
+current_transfer: contextvars.ContextVar[dict | None] = contextvars.ContextVar("current_transfer", default=None)
+
+
+class TransferListener(monitoring.CommandListener):
+    # Adds the BSON size of every server reply to the running request
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        transfer = current_transfer.get()
+        if transfer is None:
+            return
+        transfer["commands"] += 1
+        transfer["bytes"] += len(bson.encode(event.reply))
+
+    def failed(self, event):
+        pass
+
+
+class TransferStats:
+
+    def __init__(self):
+        self._lock = Lock()
+        self._routes: dict = {}
+
+    def record(self, route: str, transfer: dict):
+        with self._lock:
+            entry = self._routes.setdefault(route, {"requests": 0, "commands": 0, "bytes": 0})
+            entry["requests"] += 1
+            entry["commands"] += transfer["commands"]
+            entry["bytes"] += transfer["bytes"]
+
+    def clear(self):
+        with self._lock:
+            self._routes.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                route: {
+                    **entry,
+                    "bytes_per_request": entry["bytes"] // entry["requests"]
+                }
+                for route, entry in sorted(self._routes.items())
+            }
+
+
+transfer_stats = TransferStats()
+
+
+def transfer_listeners() -> list:
+    # Encoding every reply costs CPU, so this only runs when asked for
+    return [TransferListener()] if DB_TRANSFER_STATS else []
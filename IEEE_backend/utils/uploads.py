@@ -0,0 +1,190 @@
+from fastapi import HTTPException, Request, status
+from gridfs import AsyncGridFS
+from python_multipart.multipart import MultipartParser, MultipartState, parse_options_header
+
+# Plain form fields are small, anything bigger is not an event form
+MAX_FIELD_SIZE = 16 * 1024
+MAX_FIELDS = 50
+# Enough leading bytes to tell every accepted format apart
+SNIFF_SIZE = 16
+# Small GridFS chunks, so each one is flushed as soon as it fills
+# rather than when the upload ends
+UPLOAD_CHUNK_SIZE = 16 * 1024
+
+IMAGE_SIGNATURES = [
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+]
+
+
+def sniff_image_type(head: bytes) -> str | None:
+    for signature, content_type in IMAGE_SIGNATURES:
+        if head.startswith(signature):
+            return content_type
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    if head[4:8] == b"ftyp" and head[8:12] in (b"avif", b"avis"):
+        return "image/avif"
+    return None
+
+
+def bad_upload(detail: str) -> HTTPException:
+    return HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=detail)
+
+
+class UploadedImage:
+
+    def __init__(self, file_id, filename: str | None, content_type: str, data: bytes):
+        self.file_id = file_id
+        self.filename = filename
+        self.content_type = content_type
+        # At most max_image_size bytes, kept for the resized variants
+        self.data = data
+
+
+class ImageWriter:
+    # Receives the image part chunk by chunk: holds back the first bytes
+    # until the type is known, then writes straight into GridFS and
+    # gives up as soon as the size cap is passed
+
+    def __init__(self, fs: AsyncGridFS, filename: str | None, max_size: int):
+        self.fs = fs
+        self.filename = filename
+        self.max_size = max_size
+        self.data = bytearray()
+        self.content_type: str | None = None
+        self.grid_in = None
+        self.written = 0
+
+
+    async def _open(self):
+        self.content_type = sniff_image_type(bytes(self.data[:SNIFF_SIZE]))
+        if self.content_type is None:
+            raise bad_upload("Unsupported image type")
+        self.grid_in = self.fs.new_file(
+            filename=self.filename,
+            content_type=self.content_type,
+            chunk_size=UPLOAD_CHUNK_SIZE
+        )
+
+
+    async def write(self, chunk: bytes):
+        if len(self.data) + len(chunk) > self.max_size:
+            raise bad_upload(f"Image size exceeds {self.max_size // 1024}KB")
+        self.data += chunk
+
+        if self.grid_in is None:
+            if len(self.data) < SNIFF_SIZE:
+                return
+            await self._open()
+        await self.grid_in.write(bytes(self.data[self.written:]))
+        self.written = len(self.data)
+
+
+    async def close(self) -> UploadedImage | None:
+        if not self.data:
+            # An empty file input, as browsers send when nothing is picked
+            return None
+        if self.grid_in is None:
+            await self._open()
+        if self.written < len(self.data):
+            await self.grid_in.write(bytes(self.data[self.written:]))
+        await self.grid_in.close()
+        return UploadedImage(self.grid_in._id, self.filename, self.content_type, bytes(self.data))
+
+
+    async def abort(self):
+        if self.grid_in is not None:
+            await self.grid_in.abort()
+
+
+async def read_event_form(
+    request: Request,
+    fs: AsyncGridFS,
+    max_image_size: int,
+    image_field: str = "image"
+) -> tuple[dict, UploadedImage | None]:
+    # Parses multipart/form-data as it arrives instead of spooling the
+    # whole body first. Returns the text fields and the stored image.
+    content_type, params = parse_options_header(request.headers.get("content-type", ""))
+    if content_type != b"multipart/form-data" or b"boundary" not in params:
+        raise bad_upload("Expected multipart/form-data")
+
+    events = []
+    parser = MultipartParser(params[b"boundary"], {
+        "on_part_begin": lambda: events.append(("part", None)),
+        "on_header_field": lambda data, start, end: events.append(("header_field", data[start:end])),
+        "on_header_value": lambda data, start, end: events.append(("header_value", data[start:end])),
+        "on_header_end": lambda: events.append(("header_end", None)),
+        "on_headers_finished": lambda: events.append(("headers", None)),
+        "on_part_data": lambda data, start, end: events.append(("data", data[start:end])),
+        "on_part_end": lambda: events.append(("end", None)),
+    })
+
+    fields: dict = {}
+    image: UploadedImage | None = None
+    writer: ImageWriter | None = None
+    headers: dict = {}
+    header_field = header_value = b""
+    name = None
+    value = bytearray()
+
+    try:
+        async for chunk in request.stream():
+            parser.write(chunk)
+            for kind, data in events:
+                if kind == "part":
+                    headers = {}
+                    header_field = header_value = b""
+                    value = bytearray()
+                    writer = None
+                elif kind == "header_field":
+                    header_field += data
+                elif kind == "header_value":
+                    header_value += data
+                elif kind == "header_end":
+                    headers[header_field.lower()] = header_value
+                    header_field = header_value = b""
+                elif kind == "headers":
+                    _, options = parse_options_header(headers.get(b"content-disposition", b""))
+                    name = options.get(b"name", b"").decode()
+                    if b"filename" in options:
+                        # Other file parts are read and dropped
+                        if name == image_field and image is None:
+                            writer = ImageWriter(fs, options[b"filename"].decode(), max_image_size)
+                        else:
+                            name = None
+                    elif len(fields) >= MAX_FIELDS:
+                        raise bad_upload("Too many form fields")
+                elif kind == "data":
+                    if writer is not None:
+                        await writer.write(data)
+                    elif name is not None:
+                        value += data
+                        if len(value) > MAX_FIELD_SIZE:
+                            raise bad_upload(f"Form field {name} is too large")
+                elif kind == "end":
+                    if writer is not None:
+                        image = await writer.close()
+                        writer = None
+                    elif name is not None:
+                        try:
+                            fields[name] = value.decode()
+                        except UnicodeDecodeError:
+                            raise bad_upload(f"Form field {name} is not valid UTF-8")
+            events.clear()
+        parser.finalize()
+        # finalize() accepts a body cut off mid-part, which would leave
+        # the image half written and the later fields missing
+        if writer is not None or parser.state != MultipartState.END:
+            raise bad_upload("Incomplete multipart body")
+    except BaseException:
+        if writer is not None:
+            await writer.abort()
+        if image is not None:
+            await fs.delete(image.file_id)
+        raise
+
+    return fields, image
@@ -0,0 +1,88 @@
+import io
+import logging
+from concurrent.futures import Future, ThreadPoolExecutor
+from bson import ObjectId
+from gridfs import GridFS
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+# Size name -> longest side in pixels
+VARIANTS = {"card": 480, "detail": 1200}
+WEBP_QUALITY = 80
+# A 50KB upload can still declare a huge canvas; past this many pixels
+# no variant is made and the original is served
+MAX_SOURCE_PIXELS = 40_000_000
+
+# Pillow releases the GIL while decoding and encoding
+_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="variants")
+
+
+class TooManyPixels(Exception):
+    pass
+
+
+def render_variant(data: bytes, max_side: int) -> bytes:
+    with Image.open(io.BytesIO(data)) as image:
+        # Only the header is read so far, nothing is decoded yet
+        width, height = image.size
+        if width * height > MAX_SOURCE_PIXELS:
+            raise TooManyPixels(f"{width}x{height}")
+        # JPEGs are decoded at the smallest scale still covering max_side
+        if image.format == "JPEG":
+            image.draft(None, (max_side, max_side))
+        image = ImageOps.exif_transpose(image)
+        # thumbnail() only ever shrinks
+        image.thumbnail((max_side, max_side))
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA" if "transparency" in image.info or "A" in image.getbands() else "RGB")
+        out = io.BytesIO()
+        image.save(out, "WEBP", quality=WEBP_QUALITY, method=4)
+        return out.getvalue()
+
+
+def store_variants(fs: GridFS, original_id: ObjectId, data: bytes):
+    for size, max_side in VARIANTS.items():
+        metadata = {"variant_of": original_id, "size": size}
+        try:
+            variant = render_variant(data, max_side)
+        except TooManyPixels as error:
+            logger.warning("Image %s is too large to resize: %s", original_id, error)
+            variant = None
+        except Exception:
+            logger.exception("Could not resize image %s", original_id)
+            variant = None
+
+        if variant is None:
+            # An empty marker, so the image routes serve the original in
+            # its place for good rather than looking for it every time
+            fs.put(b"", filename=f"{original_id}_{size}.failed", metadata={**metadata, "failed": True})
+        else:
+            fs.put(
+                variant,
+                filename=f"{original_id}_{size}.webp",
+                content_type="image/webp",
+                metadata=metadata
+            )
+
+        # Replaced or deleted while this ran: its delete_variants may
+        # have come before the put above, so clean up here
+        if not fs.exists(original_id):
+            delete_variants(fs, original_id)
+            return
+
+
+def generate_variants(fs: GridFS, original_id: ObjectId, data: bytes) -> Future:
+    # Runs after the upload request returns, until then the image
+    # routes fall back to the original
+    return _pool.submit(store_variants, fs, original_id, data)
+
+
+def find_variant(fs: GridFS, original_id: ObjectId, size: str):
+    # The variant, a failed marker (metadata.failed) or None while pending
+    return fs.find_one({"metadata.variant_of": original_id, "metadata.size": size})
+
+
+def delete_variants(fs: GridFS, original_id: ObjectId):
+    for grid_out in fs.find({"metadata.variant_of": original_id}):
+        fs.delete(grid_out._id)
@@ -0,0 +1,156 @@
+import asyncio
+from fastapi import HTTPException, status
+from pymongo import InsertOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError, WriteError
+
+MAX_BATCH = 500
+FLUSH_INTERVAL = 0.005
+MAX_PENDING = 5000
+ENQUEUE_TIMEOUT = 2.0
+
+
+class WriteBuffer:
+    # Group commit for inserts: callers are queued and flushed together in
+    # one unordered bulk_write, and submit() only returns once its own
+    # document is written, so an ack always means committed.
+
+    def __init__(
+        self,
+        max_batch: int = MAX_BATCH,
+        flush_interval: float = FLUSH_INTERVAL,
+        max_pending: int = MAX_PENDING,
+        enqueue_timeout: float = ENQUEUE_TIMEOUT
+    ):
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.enqueue_timeout = enqueue_timeout
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._queue: asyncio.Queue | None = None
+        self._worker: asyncio.Task | None = None
+        self.batches = 0
+        self.flushed = 0
+        self.writes = 0
+        self.rejected = 0
+        self.largest_batch = 0
+
+
+    def _ensure_worker(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._queue = asyncio.Queue(maxsize=self.max_pending)
+            self._worker = None
+        if self._worker is None or self._worker.done():
+            self._worker = loop.create_task(self._run())
+
+
+    async def submit(self, collection, document: dict):
+        self._ensure_worker()
+        future = self._loop.create_future()
+
+        # Backpressure: a full queue makes callers wait, then turns them away
+        try:
+            await asyncio.wait_for(
+                self._queue.put((collection, document, future)),
+                self.enqueue_timeout
+            )
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many registrations in progress, please retry"
+            )
+
+        return await future
+
+
+    async def _next_batch(self) -> list:
+        batch = [await self._queue.get()]
+        deadline = self._loop.time() + self.flush_interval
+
+        while len(batch) < self.max_batch:
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+            timeout = deadline - self._loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+
+        return batch
+
+
+    async def _run(self):
+        while True:
+            batch = await self._next_batch()
+            try:
+                await self._flush(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+
+    async def _flush(self, batch: list):
+        self.batches += 1
+        self.flushed += len(batch)
+        self.largest_batch = max(self.largest_batch, len(batch))
+
+        groups: dict = {}
+        for collection, document, future in batch:
+            groups.setdefault(collection.full_name, (collection, []))[1].append((document, future))
+
+        for collection, items in groups.values():
+            errors = {}
+            try:
+                await collection.bulk_write(
+                    [InsertOne(document) for document, _ in items],
+                    ordered=False
+                )
+            except BulkWriteError as e:
+                errors = {error["index"]: error for error in e.details.get("writeErrors", [])}
+            except Exception as e:
+                for _, future in items:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            for index, (_, future) in enumerate(items):
+                error = errors.get(index)
+                if error is None:
+                    self.writes += 1
+                if future.done():
+                    continue
+                if error is None:
+                    future.set_result(True)
+                elif error.get("code") == 11000:
+                    future.set_exception(DuplicateKeyError(error.get("errmsg"), 11000, error))
+                else:
+                    future.set_exception(WriteError(error.get("errmsg"), error.get("code"), error))
+
+
+    async def close(self):
+        # Flushes whatever is queued, then stops the worker
+        if self._worker is None or self._loop is not asyncio.get_running_loop():
+            return
+        await self._queue.join()
+        self._worker.cancel()
+        self._worker = None
+
+
+    def stats(self) -> dict:
+        return {
+            "pending": self._queue.qsize() if self._queue else 0,
+            "max_pending": self.max_pending,
+            "batches": self.batches,
+            "writes": self.writes,
+            "rejected": self.rejected,
+            "largest_batch": self.largest_batch,
+            "avg_batch": round(self.flushed / self.batches, 2) if self.batches else 0.0
+        }
+
+
+registration_buffer = WriteBuffer()
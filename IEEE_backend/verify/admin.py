@@ -1,10 +1,11 @@
 from fastapi import HTTPException, status
-from database import current_admin_collection
+from database import current_admin_collection, current_async_admin_collection
 from bson import ObjectId
 from bson.errors import InvalidId
 from typing import Tuple
+from .principal import get_principal, set_principal
 
-def verify_admin_payload(payload: dict) -> Tuple[dict|None, ObjectId, str]:
+def read_admin_payload(payload: dict) -> Tuple[str, str]:
 
     admin_id = payload.get("admin_id")
     email = payload.get("email")
@@ -21,29 +22,47 @@ def verify_admin_payload(payload: dict) -> Tuple[dict|None, ObjectId, str]:
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not a admin"
         )
-    
-    return verify_admin(admin_id, email, "Y")
 
+    return (admin_id, email)
 
 
 
-def verify_admin(admin_id: str, email: str, type:str) -> Tuple[dict|None, ObjectId, str]:
+def verify_admin_payload(payload: dict) -> Tuple[dict|None, ObjectId, str]:
 
-    email = email.lower()
+    admin_id, email = read_admin_payload(payload)
+
+    cached = get_principal("admin", admin_id, email)
+    if cached:
+        return cached
+
+    return set_principal("admin", verify_admin(admin_id, email, "Y"))
+
+
+
+async def verify_admin_payload_async(payload: dict) -> Tuple[dict|None, ObjectId, str]:
+
+    admin_id, email = read_admin_payload(payload)
 
+    cached = get_principal("admin", admin_id, email)
+    if cached:
+        return cached
+
+    return set_principal("admin", await verify_admin_async(admin_id, email, "Y"))
+
+
+
+
+def parse_admin_id(admin_id: str) -> ObjectId:
     try:
-        admin_obj_id = ObjectId(admin_id)
+        return ObjectId(admin_id)
     except InvalidId:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid admin id"
         )
 
-    admin_collection = current_admin_collection()
-    admin = admin_collection.find_one({
-        "_id": admin_obj_id,
-        "email": email
-    })
+
+def check_admin(admin: dict|None, type: str):
 
     if type == "N":
         if admin:
@@ -58,7 +77,38 @@ def verify_admin(admin_id: str, email: str, type:str) -> Tuple[dict|None, Object
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Admin not found"
             )
-        
+
+
+
+def verify_admin(admin_id: str, email: str, type:str, fields: list[str] | None = None) -> Tuple[dict|None, ObjectId, str]:
+
+    email = email.lower()
+    admin_obj_id = parse_admin_id(admin_id)
+
+    admin_collection = current_admin_collection()
+    admin = admin_collection.find_one({
+        "_id": admin_obj_id,
+        "email": email
+    }, fields)
+
+    check_admin(admin, type)
+
+    return (admin,admin_obj_id,email)
+
+
+
+async def verify_admin_async(admin_id: str, email: str, type:str, fields: list[str] | None = None) -> Tuple[dict|None, ObjectId, str]:
+
+    email = email.lower()
+    admin_obj_id = parse_admin_id(admin_id)
+
+    admin_collection = current_async_admin_collection()
+    admin = await admin_collection.find_one({
+        "_id": admin_obj_id,
+        "email": email
+    }, fields)
+
+    check_admin(admin, type)
 
     return (admin,admin_obj_id,email)
 
@@ -66,64 +116,41 @@ def verify_admin(admin_id: str, email: str, type:str) -> Tuple[dict|None, Object
 
 
 
-def verify_admin_by_email(email: str, type: str) -> Tuple[dict|None, ObjectId|None, str]:
+def verify_admin_by_email(email: str, type: str, fields: list[str] | None = None) -> Tuple[dict|None, ObjectId|None, str]:
     email = email.lower()
 
     admin_collection = current_admin_collection()
     admin = admin_collection.find_one({
         "email": email
-    })
+    }, fields)
+
+    check_admin(admin, type)
 
     if type == "N":
-        if admin:
-            raise HTTPException(
-            status_code=status.HTTP_409_CONFLICT,
-            detail="Admin Already exists"
-        )
         admin_obj_id = None
 
-
     if type == "Y":
-        if not admin:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Admin not found"
-            )
         admin_obj_id = admin["_id"]
 
     return (admin,admin_obj_id,email)
 
 
 
-def verify_admin_by_id(admin_id: str, type: str) -> Tuple[dict|None, ObjectId, str|None]:
+def verify_admin_by_id(admin_id: str, type: str, fields: list[str] | None = None) -> Tuple[dict|None, ObjectId, str|None]:
 
-    try:
-        admin_obj_id = ObjectId(admin_id)
-    except InvalidId:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid admin id"
-        )
+    admin_obj_id = parse_admin_id(admin_id)
 
     admin_collection = current_admin_collection()
     admin = admin_collection.find_one({
         "_id": admin_obj_id,
-    })
+    }, fields)
+
+    check_admin(admin, type)
 
     if type == "N":
-        if admin:
-            raise HTTPException(
-            status_code=status.HTTP_409_CONFLICT,
-            detail="Admin Already exists"
-        )
         email = None
 
     if type == "Y":
-        if not admin:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Admin not found"
-            )
         email=admin["email"]
-        
-    return (admin,admin_obj_id,email)
\ No newline at end of file
+
+    return (admin,admin_obj_id,email)
@@ -1,66 +1,65 @@
+import asyncio
 from fastapi import HTTPException, status
-from database import current_event_collection
+from database import current_async_registration_collection
+from .event_cache import event_cache
 from bson import ObjectId
 from typing import Tuple
-from datetime import datetime, time, timezone, date
+from datetime import datetime, time, timezone, date, timedelta
 
 
 
-def verify_event(event_id: str) -> Tuple[dict, ObjectId]:
+def parse_event_id(event_id: str) -> ObjectId:
     if not ObjectId.is_valid(event_id):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Invalid event_id"
         )
-    
-    event_oid = ObjectId(event_id)
 
-    event_collection = current_event_collection()
-    event = event_collection.find_one({"_id": event_oid})
+    return ObjectId(event_id)
+
+
+def check_event(event: dict|None):
     if not event:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Event not found"
         )
-    
-    return (event,event_oid)
 
 
 
-def verify_eventRegistry(
-    event_id: ObjectId,
-    user_id: ObjectId,
-    type: str,
-    user: dict,
-    event: dict
-):
-    user_registered = any(
-        reg.get("event_id") == event_id
-        for reg in user.get("registered_event", [])
-    )
+def select_fields(event: dict, fields: list[str] | None) -> dict:
+    # fields limits the document to what the caller reads, None keeps all
+    if fields is None:
+        return event
+    return {key: value for key, value in event.items() if key == "_id" or key in fields}
 
-    event_has_user = user_id in event.get("registered_user", [])
 
-    if type == "Y":
-        if not (user_registered and event_has_user):
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="User is not registered for this event"
-            )
 
-    elif type == "N":
-        if user_registered and event_has_user:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="User is already registered for this event"
-            )
+def verify_event(event_id: str, fields: list[str] | None = None) -> Tuple[dict, ObjectId]:
+    event_oid = parse_event_id(event_id)
+
+    event = event_cache.get(event_oid)
+    check_event(event)
+
+    return (select_fields(event, fields),event_oid)
+
+
+
+async def verify_event_async(event_id: str, fields: list[str] | None = None) -> Tuple[dict, ObjectId]:
+    event_oid = parse_event_id(event_id)
+
+    event = await event_cache.get_async(event_oid)
+    check_event(event)
+
+    return (select_fields(event, fields),event_oid)
+
+
 
-    
 def verify_can_register(
         event:dict
 ):
-    # No capacity limit as requested
-    
+    # Capacity is enforced by the seat counters in utils/seats.py
+
     last_date_raw = event.get("last_date_to_register")
     if last_date_raw:
         if isinstance(last_date_raw, str):
@@ -84,3 +83,49 @@ def verify_can_register(
                     status_code=status.HTTP_400_BAD_REQUEST,
                     detail="Registration deadline has passed"
                 )
+
+
+
+def registration_open_filter() -> dict:
+    # Same cutoff as verify_can_register: 18:30 UTC on the last date
+    now = datetime.now(timezone.utc)
+    open_from = now.date()
+    if now.time() > time(18, 30, 0):
+        open_from += timedelta(days=1)
+
+    return {"$or": [
+        {"last_date_to_register": None},
+        {"last_date_to_register": {"$gte": open_from.isoformat()}},
+        {"last_date_to_register": {"$gte": datetime.combine(open_from, time())}}
+    ]}
+
+
+
+async def explain_registration_failure(event_id: ObjectId, user_id: ObjectId):
+    registration_collection = current_async_registration_collection()
+
+    event, registered = await asyncio.gather(
+        event_cache.get_async(event_id),
+        registration_collection.find_one({"event_id": event_id, "user_id": user_id}, {"_id": 1})
+    )
+
+    check_event(event)
+
+    if registered:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="User is already registered for this event"
+        )
+
+    verify_can_register(event)
+
+    if event.get("event_capacity") is not None:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Event is full"
+        )
+
+    raise HTTPException(
+        status_code=status.HTTP_409_CONFLICT,
+        detail="Registration could not be completed"
+    )
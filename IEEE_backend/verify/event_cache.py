@@ -0,0 +1,194 @@
+import copy
+import json
+import time
+from threading import Lock
+from bson import ObjectId
+from database import current_handles
+from utils.etag import make_etag
+from utils.signed_urls import url_window, sign_image_url
+
+# How long a cached session may be served before its version is re-read
+VERSION_CHECK_INTERVAL = 2
+
+EXCLUDED_FIELDS = {"registered_user": 0, "registered_team": 0, "remarked_user": 0, "remarked_team": 0}
+
+VERSION_ID = "event"
+
+# Left out of the /users/events catalog
+CATALOG_HIDDEN_FIELDS = ("remark", "created_on")
+
+
+class SessionEvents:
+
+    def __init__(self, version: int, events: dict):
+        self.version = version
+        self.events = events
+        self.checked_at = time.monotonic()
+        # (url window, body, etag) of the rendered catalog, built on
+        # first request and again when its signed image URLs roll over
+        self.catalog: tuple[int, bytes, str] | None = None
+
+
+def catalog_rows(db_name: str, events: list, window: int) -> list[dict]:
+    rows = []
+    for event in events:
+        event = {k: v for k, v in event.items() if k not in CATALOG_HIDDEN_FIELDS}
+        event["_id"] = str(event["_id"])
+        event["event_thumbnail_id"] = str(event.get("event_thumbnail_id", None))
+        event["event_thumbnail_url"] = sign_image_url(db_name, event["event_thumbnail_id"], window)
+        rows.append(event)
+    return rows
+
+
+def render_catalog(db_name: str, events: list, window: int) -> tuple[int, bytes, str]:
+    data = catalog_rows(db_name, events, window)
+    # The whole catalog is one page, like a paged response without a next one
+    body = json.dumps({"success": True, "data": data, "next": None}, separators=(",", ":"), default=str).encode()
+    return window, body, make_etag(body)
+
+
+class EventCache:
+    # Every event of a session, loaded in one find() and keyed by _id.
+    # Writers bump a version document in the session database, so other
+    # workers notice within VERSION_CHECK_INTERVAL and reload.
+
+    def __init__(self):
+        self._lock = Lock()
+        self._sessions: dict[str, SessionEvents] = {}
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+
+
+    def _cached(self, db_name: str) -> SessionEvents | None:
+        entry = self._sessions.get(db_name)
+        if entry and time.monotonic() - entry.checked_at < VERSION_CHECK_INTERVAL:
+            self.hits += 1
+            return entry
+        return None
+
+
+    def _revalidate(self, db_name: str, version: int) -> SessionEvents | None:
+        entry = self._sessions.get(db_name)
+        if entry and entry.version == version:
+            entry.checked_at = time.monotonic()
+            self.revalidations += 1
+            return entry
+        return None
+
+
+    def _store(self, db_name: str, version: int, events: list) -> SessionEvents:
+        self.misses += 1
+        entry = SessionEvents(version, {event["_id"]: event for event in events})
+        with self._lock:
+            self._sessions[db_name] = entry
+        return entry
+
+
+    def _session_events(self) -> SessionEvents:
+        handles = current_handles()
+        entry = self._cached(handles.db_name)
+        if entry:
+            return entry
+
+        # The version is read before the events: a write landing in
+        # between leaves an old stamp, which forces another reload
+        stamp = handles.db["cache_versions"].find_one({"_id": VERSION_ID})
+        version = stamp["version"] if stamp else 0
+        entry = self._revalidate(handles.db_name, version)
+        if entry:
+            return entry
+
+        return self._store(handles.db_name, version, list(handles.event.find({}, EXCLUDED_FIELDS)))
+
+
+    async def _session_events_async(self) -> SessionEvents:
+        handles = current_handles()
+        entry = self._cached(handles.db_name)
+        if entry:
+            return entry
+
+        stamp = await handles.async_db["cache_versions"].find_one({"_id": VERSION_ID})
+        version = stamp["version"] if stamp else 0
+        entry = self._revalidate(handles.db_name, version)
+        if entry:
+            return entry
+
+        events = await handles.async_event.find({}, EXCLUDED_FIELDS).to_list()
+        return self._store(handles.db_name, version, events)
+
+
+    def get(self, event_id: ObjectId) -> dict | None:
+        entry = self._session_events()
+        event = entry.events.get(event_id)
+        if event is None:
+            # May have been created by another worker since the last reload
+            event = current_handles().event.find_one({"_id": event_id}, EXCLUDED_FIELDS)
+            if event:
+                entry.events[event_id] = event
+                entry.catalog = None
+        return copy.deepcopy(event)
+
+
+    async def get_async(self, event_id: ObjectId) -> dict | None:
+        entry = await self._session_events_async()
+        event = entry.events.get(event_id)
+        if event is None:
+            event = await current_handles().async_event.find_one({"_id": event_id}, EXCLUDED_FIELDS)
+            if event:
+                entry.events[event_id] = event
+                entry.catalog = None
+        return copy.deepcopy(event)
+
+
+    def all(self) -> list[dict]:
+        return copy.deepcopy(list(self._session_events().events.values()))
+
+
+    async def all_async(self) -> list[dict]:
+        return copy.deepcopy(list((await self._session_events_async()).events.values()))
+
+
+    async def catalog_async(self) -> tuple[bytes, str]:
+        # Rendered once per cached session and URL window, so it is
+        # dropped along with the events whenever the version moves
+        entry = await self._session_events_async()
+        window = url_window()
+        catalog = entry.catalog
+        if catalog is None or catalog[0] != window:
+            catalog = entry.catalog = render_catalog(current_handles().db_name, list(entry.events.values()), window)
+        return catalog[1], catalog[2]
+
+
+    async def catalog_rows_async(self) -> list[dict]:
+        entry = await self._session_events_async()
+        return catalog_rows(current_handles().db_name, list(entry.events.values()), url_window())
+
+
+    def invalidate(self):
+        # Call after the event write has been applied
+        handles = current_handles()
+        handles.db["cache_versions"].update_one(
+            {"_id": VERSION_ID},
+            {"$inc": {"version": 1}},
+            upsert=True
+        )
+        with self._lock:
+            self._sessions.pop(handles.db_name, None)
+
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.revalidations + self.misses
+        return {
+            "sessions": {
+                db_name: {"version": entry.version, "events": len(entry.events)}
+                for db_name, entry in list(self._sessions.items())
+            },
+            "hits": self.hits,
+            "revalidations": self.revalidations,
+            "misses": self.misses,
+            "hit_rate": round((self.hits + self.revalidations) / lookups, 4) if lookups else 0.0
+        }
+
+
+event_cache = EventCache()
@@ -0,0 +1,44 @@
+import copy
+from typing import Tuple
+from bson import ObjectId
+from database import current_session
+from utils.cache import TTLCache
+
+PRINCIPAL_TTL = 30
+
+principal_cache = TTLCache(maxsize=10000, ttl=PRINCIPAL_TTL)
+
+
+def principal_key(role: str, principal_id) -> tuple:
+    # Superadmins are not scoped to an academic session
+    session = None if role == "superadmin" else current_session()
+    return (role, session, str(principal_id))
+
+
+def get_principal(role: str, principal_id: str, email: str) -> Tuple[dict, ObjectId, str] | None:
+    entry = principal_cache.get(principal_key(role, principal_id))
+    if entry is None:
+        return None
+
+    principal, principal_obj_id, principal_email = entry
+    if principal_email != email.lower():
+        return None
+
+    return (copy.deepcopy(principal), principal_obj_id, principal_email)
+
+
+def set_principal(role: str, resolved: Tuple[dict, ObjectId, str]) -> Tuple[dict, ObjectId, str]:
+    principal, principal_obj_id, principal_email = resolved
+    principal_cache.set(
+        principal_key(role, principal_obj_id),
+        (copy.deepcopy(principal), principal_obj_id, principal_email)
+    )
+    return resolved
+
+
+def invalidate_principal(role: str, principal_id) -> None:
+    principal_cache.pop(principal_key(role, principal_id))
+
+
+def clear_principals(role: str) -> None:
+    principal_cache.pop_where(lambda key: key[0] == role)
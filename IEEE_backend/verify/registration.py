@@ -0,0 +1,49 @@
+from fastapi import HTTPException, status
+from database import current_registration_collection, current_async_registration_collection
+from bson import ObjectId
+
+
+
+def check_registration(registration: dict|None, type: str):
+
+    if type == "Y":
+        if not registration:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="User is not registered for this event"
+            )
+
+    elif type == "N":
+        if registration:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="User is already registered for this event"
+            )
+
+
+
+def verify_registration(event_id: ObjectId, user_id: ObjectId, type: str) -> dict|None:
+
+    registration_collection = current_registration_collection()
+    registration = registration_collection.find_one({
+        "event_id": event_id,
+        "user_id": user_id
+    })
+
+    check_registration(registration, type)
+
+    return registration
+
+
+
+async def verify_registration_async(event_id: ObjectId, user_id: ObjectId, type: str) -> dict|None:
+
+    registration_collection = current_async_registration_collection()
+    registration = await registration_collection.find_one({
+        "event_id": event_id,
+        "user_id": user_id
+    })
+
+    check_registration(registration, type)
+
+    return registration
@@ -1,8 +1,8 @@
 from fastapi import HTTPException, status
 from bson import ObjectId
 from typing import Tuple
-from .admin import verify_admin_payload, verify_admin, verify_admin_by_email, verify_admin_by_id
-from .superadmin import verify_superadmin_payload, verify_superadmin, verify_superadmin_by_email, verify_superadmin_by_id
+from .admin import verify_admin_payload, verify_admin_payload_async, verify_admin, verify_admin_by_email, verify_admin_by_id
+from .superadmin import verify_superadmin_payload, verify_superadmin_payload_async, verify_superadmin, verify_superadmin_by_email, verify_superadmin_by_id
 
 def verify_sudo_payload(payload: dict) -> Tuple[dict|None, ObjectId, str, str]:
 
@@ -28,6 +28,32 @@ def verify_sudo_payload(payload: dict) -> Tuple[dict|None, ObjectId, str, str]:
         )
     
     return (sudo, sudo_id, sudo_email,role)
+
+
+
+async def verify_sudo_payload_async(payload: dict) -> Tuple[dict|None, ObjectId, str, str]:
+
+    role = payload.get("role")
+
+    if not role:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid token payload"
+        )
+
+    if role == "admin":
+        sudo, sudo_id, sudo_email = await verify_admin_payload_async(payload)
+
+    elif role == "superadmin":
+        sudo, sudo_id, sudo_email = await verify_superadmin_payload_async(payload)
+
+    else:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Unauthorized"
+        )
+
+    return (sudo, sudo_id, sudo_email,role)
     
 
 
@@ -1,10 +1,11 @@
 from fastapi import HTTPException, status
-from database import current_superadmin_collection
+from database import current_superadmin_collection, current_async_superadmin_collection
 from bson import ObjectId
 from bson.errors import InvalidId
 from typing import Tuple
+from .principal import get_principal, set_principal
 
-def verify_superadmin_payload(payload: dict) -> Tuple[dict|None, ObjectId, str]:
+def read_superadmin_payload(payload: dict) -> Tuple[str, str]:
 
     superadmin_id = payload.get("superadmin_id")
     email = payload.get("email")
@@ -21,29 +22,47 @@ def verify_superadmin_payload(payload: dict) -> Tuple[dict|None, ObjectId, str]:
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not a superadmin"
         )
-    
-    return verify_superadmin(superadmin_id, email, "Y")
 
+    return (superadmin_id, email)
 
 
 
-def verify_superadmin(superadmin_id: str, email: str, type:str) -> Tuple[dict|None, ObjectId, str]:
+def verify_superadmin_payload(payload: dict) -> Tuple[dict|None, ObjectId, str]:
 
-    email = email.lower()
+    superadmin_id, email = read_superadmin_payload(payload)
+
+    cached = get_principal("superadmin", superadmin_id, email)
+    if cached:
+        return cached
+
+    return set_principal("superadmin", verify_superadmin(superadmin_id, email, "Y"))
+
+
+
+async def verify_superadmin_payload_async(payload: dict) -> Tuple[dict|None, ObjectId, str]:
+
+    superadmin_id, email = read_superadmin_payload(payload)
 
+    cached = get_principal("superadmin", superadmin_id, email)
+    if cached:
+        return cached
+
+    return set_principal("superadmin", await verify_superadmin_async(superadmin_id, email, "Y"))
+
+
+
+
+def parse_superadmin_id(superadmin_id: str) -> ObjectId:
     try:
-        superadmin_obj_id = ObjectId(superadmin_id)
+        return ObjectId(superadmin_id)
     except InvalidId:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid superadmin id"
         )
 
-    superadmin_collection = current_superadmin_collection()
-    superadmin = superadmin_collection.find_one({
-        "_id": superadmin_obj_id,
-        "email": email
-    })
+
+def check_superadmin(superadmin: dict|None, type: str):
 
     if type == "N":
         if superadmin:
@@ -58,7 +77,38 @@ def verify_superadmin(superadmin_id: str, email: str, type:str) -> Tuple[dict|No
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Superadmin not found"
             )
-        
+
+
+
+def verify_superadmin(superadmin_id: str, email: str, type:str, fields: list[str] | None = None) -> Tuple[dict|None, ObjectId, str]:
+
+    email = email.lower()
+    superadmin_obj_id = parse_superadmin_id(superadmin_id)
+
+    superadmin_collection = current_superadmin_collection()
+    superadmin = superadmin_collection.find_one({
+        "_id": superadmin_obj_id,
+        "email": email
+    }, fields)
+
+    check_superadmin(superadmin, type)
+
+    return (superadmin,superadmin_obj_id,email)
+
+
+
+async def verify_superadmin_async(superadmin_id: str, email: str, type:str, fields: list[str] | None = None) -> Tuple[dict|None, ObjectId, str]:
+
+    email = email.lower()
+    superadmin_obj_id = parse_superadmin_id(superadmin_id)
+
+    superadmin_collection = current_async_superadmin_collection()
+    superadmin = await superadmin_collection.find_one({
+        "_id": superadmin_obj_id,
+        "email": email
+    }, fields)
+
+    check_superadmin(superadmin, type)
 
     return (superadmin,superadmin_obj_id,email)
 
@@ -66,64 +116,41 @@ def verify_superadmin(superadmin_id: str, email: str, type:str) -> Tuple[dict|No
 
 
 
-def verify_superadmin_by_email(email: str, type: str) -> Tuple[dict|None, ObjectId|None, str]:
+def verify_superadmin_by_email(email: str, type: str, fields: list[str] | None = None) -> Tuple[dict|None, ObjectId|None, str]:
     email = email.lower()
 
     superadmin_collection = current_superadmin_collection()
     superadmin = superadmin_collection.find_one({
         "email": email
-    })
+    }, fields)
+
+    check_superadmin(superadmin, type)
 
     if type == "N":
-        if superadmin:
-            raise HTTPException(
-            status_code=status.HTTP_409_CONFLICT,
-            detail="Superadmin Already exists"
-        )
         superadmin_obj_id = None
 
-
     if type == "Y":
-        if not superadmin:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Superadmin not found"
-            )
         superadmin_obj_id = superadmin["_id"]
 
     return (superadmin,superadmin_obj_id,email)
 
 
 
-def verify_superadmin_by_id(superadmin_id: str, type: str) -> Tuple[dict|None, ObjectId, str|None]:
+def verify_superadmin_by_id(superadmin_id: str, type: str, fields: list[str] | None = None) -> Tuple[dict|None, ObjectId, str|None]:
 
-    try:
-        superadmin_obj_id = ObjectId(superadmin_id)
-    except InvalidId:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid superadmin id"
-        )
+    superadmin_obj_id = parse_superadmin_id(superadmin_id)
 
     superadmin_collection = current_superadmin_collection()
     superadmin = superadmin_collection.find_one({
         "_id": superadmin_obj_id,
-    })
+    }, fields)
+
+    check_superadmin(superadmin, type)
 
     if type == "N":
-        if superadmin:
-            raise HTTPException(
-            status_code=status.HTTP_409_CONFLICT,
-            detail="Superadmin Already exists"
-        )
         email = None
 
     if type == "Y":
-        if not superadmin:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Superadmin not found"
-            )
         email=superadmin["email"]
-        
-    return (superadmin,superadmin_obj_id,email)
\ No newline at end of file
+
+    return (superadmin,superadmin_obj_id,email)
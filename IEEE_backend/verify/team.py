@@ -100,18 +100,13 @@ def verify_teamLeader(
 
 
 def verify_user_not_in_team(
-    user: dict,
-    event_id: ObjectId
+    registration: dict
 ):
-    for reg in user.get("registered_event", []):
-        if (
-            reg.get("event_id") == event_id
-            and "team_id" in reg
-        ):
-            raise HTTPException(
-                status_code=status.HTTP_409_CONFLICT,
-                detail="User already belongs to a team for this event"
-            )
+    if registration.get("team_id") is not None:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="User already belongs to a team for this event"
+        )
 
 
 
@@ -131,7 +126,7 @@ def verify_is_team_allowed(event: dict):
 
     
 
-def verify_team_by_id(team_id: str) -> Tuple[dict,ObjectId]:
+def verify_team_by_id(team_id: str, fields: list[str] | None = None) -> Tuple[dict,ObjectId]:
     if not ObjectId.is_valid(team_id):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -141,7 +136,7 @@ def verify_team_by_id(team_id: str) -> Tuple[dict,ObjectId]:
     team_oid = ObjectId(team_id)
 
     team_collection = current_team_collection()
-    team = team_collection.find_one({"_id": team_oid})
+    team = team_collection.find_one({"_id": team_oid}, fields)
     if not team:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
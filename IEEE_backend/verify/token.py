@@ -1,9 +1,12 @@
+import hashlib
 from fastapi import HTTPException, status
-from google.oauth2 import id_token
-from google.auth.transport import requests
 from jose import jwt, JWTError
 from utils.reader import GOOGLE_CLIENT_ID, JWT_SECRET, JWT_ALGO
+from utils.google_certs import google_certs
+from utils.cache import TTLCache
 
+# Verified access tokens, each entry expires at the token's own exp
+token_cache = TTLCache(maxsize=10000)
 
 
 def verify_google_token(data: dict|None) -> dict:
@@ -17,11 +20,7 @@ def verify_google_token(data: dict|None) -> dict:
         raise HTTPException(status_code=400, detail="Token missing")
     
     try:
-        idinfo = id_token.verify_oauth2_token(
-            token,
-            requests.Request(),
-            GOOGLE_CLIENT_ID
-        )
+        idinfo = google_certs.verify(token, GOOGLE_CLIENT_ID)
         return idinfo
 
     except Exception:
@@ -32,6 +31,11 @@ def verify_google_token(data: dict|None) -> dict:
 
 
 def verify_access_token(token: str) -> dict:
+    digest = hashlib.sha256(token.encode()).digest()
+    payload = token_cache.get(digest)
+    if payload is not None:
+        return dict(payload)
+
     try:
         payload = jwt.decode(
             token,
@@ -42,7 +46,8 @@ def verify_access_token(token: str) -> dict:
         if payload.get("exp") is None:
             raise HTTPException(status_code=401, detail="Token has no expiry")
 
-        return payload
+        token_cache.set(digest, payload, expires_at=payload["exp"])
+        return dict(payload)
 
     except JWTError:
         raise HTTPException(
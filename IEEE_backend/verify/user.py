@@ -1,10 +1,11 @@
 from fastapi import HTTPException, status
-from database import current_user_collection
+from database import current_user_collection, current_async_user_collection
 from bson import ObjectId
 from bson.errors import InvalidId
 from typing import Tuple
+from .principal import get_principal, set_principal
 
-def verify_user_payload(payload: dict) -> Tuple[dict|None, ObjectId, str]:
+def read_user_payload(payload: dict) -> Tuple[str, str]:
 
     user_id = payload.get("user_id")
     email = payload.get("email")
@@ -21,29 +22,47 @@ def verify_user_payload(payload: dict) -> Tuple[dict|None, ObjectId, str]:
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not a user"
         )
-    
-    return verify_user(user_id, email, "Y")
 
+    return (user_id, email)
 
 
 
-def verify_user(user_id: str, email: str, type:str) -> Tuple[dict|None, ObjectId, str]:
+def verify_user_payload(payload: dict) -> Tuple[dict|None, ObjectId, str]:
 
-    email = email.lower()
+    user_id, email = read_user_payload(payload)
+
+    cached = get_principal("user", user_id, email)
+    if cached:
+        return cached
+
+    return set_principal("user", verify_user(user_id, email, "Y"))
+
+
+
+async def verify_user_payload_async(payload: dict) -> Tuple[dict|None, ObjectId, str]:
+
+    user_id, email = read_user_payload(payload)
 
+    cached = get_principal("user", user_id, email)
+    if cached:
+        return cached
+
+    return set_principal("user", await verify_user_async(user_id, email, "Y"))
+
+
+
+
+def parse_user_id(user_id: str) -> ObjectId:
     try:
-        user_obj_id = ObjectId(user_id)
+        return ObjectId(user_id)
     except InvalidId:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid user id"
         )
 
-    user_collection = current_user_collection()
-    user = user_collection.find_one({
-        "_id": user_obj_id,
-        "email": email
-    })
+
+def check_user(user: dict|None, type: str):
 
     if type == "N":
         if user:
@@ -58,7 +77,38 @@ def verify_user(user_id: str, email: str, type:str) -> Tuple[dict|None, ObjectId
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="User not found"
             )
-        
+
+
+
+def verify_user(user_id: str, email: str, type:str, fields: list[str] | None = None) -> Tuple[dict|None, ObjectId, str]:
+
+    email = email.lower()
+    user_obj_id = parse_user_id(user_id)
+
+    user_collection = current_user_collection()
+    user = user_collection.find_one({
+        "_id": user_obj_id,
+        "email": email
+    }, fields)
+
+    check_user(user, type)
+
+    return (user,user_obj_id,email)
+
+
+
+async def verify_user_async(user_id: str, email: str, type:str, fields: list[str] | None = None) -> Tuple[dict|None, ObjectId, str]:
+
+    email = email.lower()
+    user_obj_id = parse_user_id(user_id)
+
+    user_collection = current_async_user_collection()
+    user = await user_collection.find_one({
+        "_id": user_obj_id,
+        "email": email
+    }, fields)
+
+    check_user(user, type)
 
     return (user,user_obj_id,email)
 
@@ -66,64 +116,41 @@ def verify_user(user_id: str, email: str, type:str) -> Tuple[dict|None, ObjectId
 
 
 
-def verify_user_by_email(email: str, type: str) -> Tuple[dict|None, ObjectId|None, str]:
+def verify_user_by_email(email: str, type: str, fields: list[str] | None = None) -> Tuple[dict|None, ObjectId|None, str]:
     email = email.lower()
 
     user_collection = current_user_collection()
     user = user_collection.find_one({
         "email": email
-    })
+    }, fields)
+
+    check_user(user, type)
 
     if type == "N":
-        if user:
-            raise HTTPException(
-            status_code=status.HTTP_409_CONFLICT,
-            detail="User Already exists"
-        )
         user_obj_id = None
 
-
     if type == "Y":
-        if not user:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="User not found"
-            )
         user_obj_id = user["_id"]
 
     return (user,user_obj_id,email)
 
 
 
-def verify_user_by_id(user_id: str, type: str) -> Tuple[dict|None, ObjectId, str|None]:
+def verify_user_by_id(user_id: str, type: str, fields: list[str] | None = None) -> Tuple[dict|None, ObjectId, str|None]:
 
-    try:
-        user_obj_id = ObjectId(user_id)
-    except InvalidId:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid user id"
-        )
+    user_obj_id = parse_user_id(user_id)
 
     user_collection = current_user_collection()
     user = user_collection.find_one({
         "_id": user_obj_id,
-    })
+    }, fields)
+
+    check_user(user, type)
 
     if type == "N":
-        if user:
-            raise HTTPException(
-            status_code=status.HTTP_409_CONFLICT,
-            detail="User Already exists"
-        )
         email = None
 
     if type == "Y":
-        if not user:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="User not found"
-            )
         email=user["email"]
-        
-    return (user,user_obj_id,email)
\ No newline at end of file
+
+    return (user,user_obj_id,email)
@@ -113,5 +113,25 @@ export const userService = {
     getArchivedImage: async (year: string, imageId: string) => {
         const response = await api.get(`/users/image/${year}/${imageId}`);
         return response.data;
+    },
+
+    // Get many thumbnails in one request, keyed by image id
+    // Body: 4-byte big-endian index length, JSON index, then the image bytes
+    getImageBatch: async (images: { image_id: string; year?: string }[]) => {
+        const response = await api.post('/users/images', { images }, { responseType: 'arraybuffer' });
+        const buffer: ArrayBuffer = response.data;
+        const indexLength = new DataView(buffer).getUint32(0);
+        const index = JSON.parse(new TextDecoder().decode(new Uint8Array(buffer, 4, indexLength)));
+        const start = 4 + indexLength;
+
+        const blobs: Record<string, Blob> = {};
+        for (const entry of index) {
+            if (!entry.found) continue;
+            blobs[entry.image_id] = new Blob(
+                [buffer.slice(start + entry.offset, start + entry.offset + entry.length)],
+                { type: entry.content_type }
+            );
+        }
+        return blobs;
     }
 };